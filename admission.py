@@ -0,0 +1,115 @@
+import math, threading, time
+from flask import Response
+
+class ConcurrencyLimit(object):
+    """ Caps the requests of an endpoint running at once. Requests over the
+    cap wait up to queue_timeout seconds for a slot. """
+
+    def __init__(self, max_concurrency, queue_timeout=None):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout or 0
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.condition = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        with self.condition:
+            if self.in_flight >= self.max_concurrency:
+                if not self.queue_timeout:
+                    self.rejected += 1
+                    return False
+                deadline = time.time() + self.queue_timeout
+                self.queued += 1
+                try:
+                    while self.in_flight >= self.max_concurrency:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            return False
+                        self.condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+class RateLimit(object):
+    """ A token bucket per identity refilled at rate tokens per second up to
+    burst. The number of identities tracked is bounded. """
+
+    def __init__(self, rate, burst=None, max_identities=10000):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.max_identities = max_identities
+        self.buckets = {}
+        self.limited = 0
+        self.lock = threading.Lock()
+
+    def allow(self, identity):
+        """ Returns 0 when a token was taken, otherwise the seconds until one
+        is available. """
+        now = time.time()
+        with self.lock:
+            tokens, last = self.buckets.get(identity, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self.limited += 1
+                self.buckets[identity] = (tokens, now)
+                return (1 - tokens) / self.rate
+            if len(self.buckets) >= self.max_identities and not identity in self.buckets:
+                self.buckets.clear()
+            self.buckets[identity] = (tokens - 1, now)
+            return 0
+
+class Admission(object):
+    """ The admission settings of a ResourceMethod, checked by Caller before
+    any parsing or handler work. """
+
+    def __init__(self, max_concurrency=None, queue_timeout=None, rate_limit=None):
+        self.concurrency = ConcurrencyLimit(max_concurrency, queue_timeout) if max_concurrency else None
+        if isinstance(rate_limit, (tuple, list)): rate_limit = RateLimit(*rate_limit)
+        elif rate_limit and not isinstance(rate_limit, RateLimit): rate_limit = RateLimit(rate_limit)
+        self.rate_limit = rate_limit
+
+    def admit(self, identity):
+        """ Returns None when admitted, otherwise the rejection response. A
+        None result obliges the caller to release(). """
+        if self.rate_limit:
+            retry_after = self.rate_limit.allow(identity)
+            if retry_after:
+                return self.rejection(429, 'Rate limit exceeded', retry_after)
+        if self.concurrency and not self.concurrency.acquire():
+            return self.rejection(503, 'Too many concurrent requests', self.concurrency.queue_timeout or 1)
+        return None
+
+    def release(self):
+        if self.concurrency: self.concurrency.release()
+
+    def rejection(self, status, message, retry_after):
+        response = Response(message, status=status)
+        response.headers['Retry-After'] = str(int(math.ceil(retry_after)))
+        return response
+
+    def describe(self):
+        limits = {}
+        if self.concurrency:
+            limits['maxConcurrency'] = self.concurrency.max_concurrency
+            limits['queueTimeout'] = self.concurrency.queue_timeout
+        if self.rate_limit:
+            limits['rateLimit'] = {'rate': self.rate_limit.rate, 'burst': self.rate_limit.burst}
+        return limits
+
+    def stats(self):
+        stats = self.describe()
+        if self.concurrency:
+            stats['inFlight'] = self.concurrency.in_flight
+            stats['queued'] = self.concurrency.queued
+            stats['rejected'] = self.concurrency.rejected
+        if self.rate_limit:
+            stats['rateLimited'] = self.rate_limit.limited
+        return stats
@@ -0,0 +1,46 @@
+""" Compares the per-request argument binding of the old Caller, which
+introspected the handler on every call, with the precompiled CallPlan. """
+import os, sys, types, inspect, timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_swagger import CallPlan, Signature
+
+def legacy_call(function, arguments):
+    argument_list = []
+    argument_dict = {}
+    function_arg_spec = inspect.getargspec(function)
+    index = 0
+    start = 0
+    if type(function) == types.MethodType: start = 1
+    function_arg_spec_defaults = function_arg_spec.defaults
+    if function_arg_spec_defaults == None: function_arg_spec_defaults = []
+    remaining = arguments.copy()
+    for function_argument in function_arg_spec.args[start:]:
+        if index < len(function_arg_spec.args) - len(function_arg_spec_defaults):
+            if not function_argument in arguments:
+                raise ValueError('Required parameter "%s" is missing' % (function_argument))
+            argument_list.append(arguments[function_argument])
+            del remaining[function_argument]
+        else:
+            argument_dict[function_argument] = arguments[function_argument]
+            del remaining[function_argument]
+        index += 1
+    if function_arg_spec.keywords:
+        argument_dict.update(remaining)
+    return function(*argument_list, **argument_dict)
+
+def handler(account, item, limit=10, offset=0, order=None):
+    return account
+
+def main(number=100000):
+    arguments = {'account': 'a', 'item': 1, 'limit': 5, 'offset': 0, 'order': 'name'}
+    plan = CallPlan(handler, Signature())
+    legacy = min(timeit.repeat(lambda: legacy_call(handler, arguments), number=number, repeat=3))
+    compiled = min(timeit.repeat(lambda: plan(arguments), number=number, repeat=3))
+    print 'legacy   %8.3f us/call' % (legacy / number * 1e6)
+    print 'compiled %8.3f us/call' % (compiled / number * 1e6)
+    print 'speedup  %8.2fx' % (legacy / compiled)
+    return {'legacy_us': legacy / number * 1e6, 'compiled_us': compiled / number * 1e6}
+
+if __name__ == '__main__':
+    main()
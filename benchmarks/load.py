@@ -0,0 +1,118 @@
+""" Drives requests through Caller with a raw WSGI environ, without a
+network, and reports requests per second and p50 / p99 latency for
+representative signatures. """
+import os, sys, json, time, threading
+from StringIO import StringIO
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask
+from werkzeug.test import EnvironBuilder
+from swagger_ui import Swagger
+from flask_swagger import RestSwaggerAPI, Signature
+
+def build(codec=None):
+    app = flask.Flask('benchmark')
+    swagger = Swagger(app)
+    api = RestSwaggerAPI(swagger, app, codec=codec)
+
+    @api.model({'name': str, 'quantity': int, 'price': float})
+    class Line(object): pass
+
+    @api.model({'id': int, 'customer': str, 'created': datetime, 'tags': [str], 'lines': [Line]})
+    class Order(object): pass
+
+    @api.get('Orders', '/orders/{id}', 'Path and query only', Signature()
+        .path('id', type=int)
+        .query('verbose', type=int, required=False)
+        .returns(str))
+    def get_order(id, verbose=0):
+        return 'order %d' % id
+
+    @api.post('Orders', '/orders', 'Body model', Signature()
+        .body(Order, variable='order')
+        .returns(Order))
+    def post_order(order):
+        return order
+
+    @api.get('Orders', '/orders', 'Nested list model', Signature()
+        .query('count', type=int)
+        .returns([Order]))
+    def list_orders(count):
+        return orders[:count]
+
+    orders = []
+    for i in range(100):
+        order = Order()
+        order.id = i
+        order.customer = 'customer %d' % i
+        order.created = datetime(2014, 1, 1, 12, 30, i % 60)
+        order.tags = ['a', 'b']
+        order.lines = [{'name': 'item', 'quantity': j, 'price': j * 1.5} for j in range(3)]
+        orders.append(order)
+    api.setup()
+    swagger.setup()
+    body = json.dumps({'id': 1, 'customer': 'customer', 'created': '2014-01-01T12:30:00.000000',
+        'tags': ['a'], 'lines': [{'name': 'item', 'quantity': 1, 'price': 1.5}]})
+    scenarios = [
+        ('path_query', EnvironBuilder('/orders/7', query_string='verbose=1')),
+        ('body_model', EnvironBuilder('/orders', method='POST', data=body, content_type='application/json')),
+        ('nested_list', EnvironBuilder('/orders', query_string='count=50')),
+        ]
+    environs = []
+    for name, builder in scenarios:
+        environ = builder.get_environ()
+        environs.append((name, environ, environ.pop('wsgi.input').read()))
+    return app, environs
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def drive(app, environ, body, number):
+    """ Returns the latency of each of number requests, in seconds. """
+    statuses = []
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+    latencies = []
+    for i in range(number):
+        request = dict(environ)
+        request['wsgi.input'] = StringIO(body)
+        start = time.time()
+        response = app.wsgi_app(request, start_response)
+        for chunk in response: pass
+        if hasattr(response, 'close'): response.close()
+        latencies.append(time.time() - start)
+    assert all(status.startswith('200') for status in statuses), statuses[-1]
+    return latencies
+
+def measure(app, environ, body, number, threads):
+    drive(app, environ, body, min(number, 100))
+    results = []
+    start = time.time()
+    workers = [threading.Thread(target=lambda: results.append(drive(app, environ, body, number)))
+        for i in range(threads)]
+    for worker in workers: worker.start()
+    for worker in workers: worker.join()
+    elapsed = time.time() - start
+    latencies = sorted(latency for latencies in results for latency in latencies)
+    return {
+        'threads': threads,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        }
+
+def main(number=2000, threads=(1, 4), codec=None):
+    app, scenarios = build(codec)
+    results = {}
+    for name, environ, body in scenarios:
+        for count in threads:
+            result = measure(app, environ, body, number / count, count)
+            results['%s/%d' % (name, count)] = result
+            print '%-12s %2d threads: %8.0f req/s p50 %7.3f ms p99 %7.3f ms' % (
+                name, count, result['rps'], result['p50_ms'], result['p99_ms'])
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+""" Runs the benchmark suite and writes the results as JSON, so that runs of
+different releases can be compared:
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py -o new.json --compare results.json
+"""
+import os, sys, json, time, platform, optparse, subprocess
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+suites = ['dispatch', 'parsing', 'serialization', 'startup', 'load']
+
+# Metrics where a larger number is an improvement, every other number is a time.
+higher_is_better = ('rps', 'objects_per_second')
+
+def revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(names):
+    results = {}
+    for name in names:
+        print '== %s' % (name)
+        results[name] = __import__(name).main()
+    return {
+        'revision': revision(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+        }
+
+def flatten(results, prefix=''):
+    for key, value in sorted(results.items()):
+        if isinstance(value, dict):
+            for item in flatten(value, prefix + key + '/'): yield item
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + key, value
+
+def compare(baseline, current, threshold):
+    """ Prints every metric that changed by more than threshold and returns
+    the number of regressions. """
+    old = dict(flatten(baseline['results']))
+    regressions = 0
+    for key, value in flatten(current['results']):
+        if not old.get(key): continue
+        change = (value - old[key]) / float(old[key])
+        if abs(change) < threshold: continue
+        better = change > 0 if key.rsplit('/', 1)[-1] in higher_is_better else change < 0
+        if not better: regressions += 1
+        print '%-10s %-50s %12.3f -> %12.3f %+7.1f%%' % (
+            better and 'improved' or 'REGRESSED', key, old[key], value, change * 100)
+    return regressions
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [suite ...]')
+    parser.add_option('-o', '--output', help='write the results to this JSON file')
+    parser.add_option('-c', '--compare', help='compare against the results in this JSON file')
+    parser.add_option('-t', '--threshold', type=float, default=0.1,
+        help='relative change reported by --compare [default %default]')
+    options, names = parser.parse_args()
+    for name in names:
+        if not name in suites: parser.error('unknown suite %s, choose from %s' % (name, ', '.join(suites)))
+    current = run(names or suites)
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(current, output, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as baseline:
+            if compare(json.load(baseline), current, options.threshold): sys.exit(1)
+
+if __name__ == '__main__':
+    main()
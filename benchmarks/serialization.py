@@ -0,0 +1,69 @@
+""" Compares the generic to_json / from_json reference path with the compiled
+Model encoders and decoders, checking that both produce the same output. """
+import os, sys, copy, timeit
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask
+from swagger_ui import Swagger
+from flask_swagger import RestSwaggerAPI, to_json, from_json, compile_to_json, compile_from_json
+
+app = flask.Flask('benchmark')
+api = RestSwaggerAPI(Swagger(app), app)
+
+@api.model({'name': str, 'quantity': int, 'price': float})
+class Line(object): pass
+
+@api.model({
+    'id': int,
+    'customer': str,
+    'created': datetime,
+    'paid': bool,
+    'tags': [str],
+    'lines': [Line],
+    })
+class Order(object): pass
+
+def make_orders(count):
+    orders = []
+    for i in range(count):
+        order = Order()
+        order.id = i
+        order.customer = 'customer %d' % i
+        order.created = datetime(2014, 1, 1, 12, 30, i % 60)
+        order.paid = i % 2 == 0
+        order.tags = ['a', 'b']
+        order.lines = [{'name': 'item', 'quantity': j, 'price': j * 1.5} for j in range(3)]
+        orders.append(order)
+    return orders
+
+def main(sizes=(10, 1000, 10000)):
+    for model in api.swagger_models: model.compile()
+    codec = api.codec
+    encoder = compile_to_json([Order], codec)
+    decoder = compile_from_json([Order], codec)
+    results = {}
+    for size in sizes:
+        orders = make_orders(size)
+        reference = to_json([Order], orders)
+        assert codec.loads(codec.dumps(encoder(orders))) == reference
+        decoded = from_json([Order], copy.deepcopy(reference))
+        assert decoder(copy.deepcopy(reference)) == decoded
+        number = max(1, 10000 / size)
+        generic = min(timeit.repeat(lambda: codec.dumps(to_json([Order], orders)), number=number, repeat=3)) / number
+        compiled = min(timeit.repeat(lambda: codec.dumps(encoder(orders)), number=number, repeat=3)) / number
+        print 'encode %6d objects: generic %9.3f ms compiled %9.3f ms speedup %5.2fx' % (
+            size, generic * 1e3, compiled * 1e3, generic / compiled)
+        results['encode/%d' % size] = {'generic_ms': generic * 1e3, 'compiled_ms': compiled * 1e3,
+            'objects_per_second': size / compiled}
+        payloads = [copy.deepcopy(reference) for i in range(6)]
+        generic = min(timeit.repeat(lambda: from_json([Order], payloads.pop()), number=1, repeat=3))
+        compiled = min(timeit.repeat(lambda: decoder(payloads.pop()), number=1, repeat=3))
+        print 'decode %6d objects: generic %9.3f ms compiled %9.3f ms speedup %5.2fx' % (
+            size, generic * 1e3, compiled * 1e3, generic / compiled)
+        results['decode/%d' % size] = {'generic_ms': generic * 1e3, 'compiled_ms': compiled * 1e3,
+            'objects_per_second': size / compiled}
+    return results
+
+if __name__ == '__main__':
+    main()
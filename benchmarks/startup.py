@@ -0,0 +1,49 @@
+""" Measures RestSwaggerAPI.setup() with many synthetic endpoints and the
+cost of describing the Swagger spec on its first request. """
+import os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask
+from swagger_ui import Swagger
+from flask_swagger import RestSwaggerAPI, Signature
+
+def build(count, apis=20):
+    app = flask.Flask('benchmark')
+    swagger = Swagger(app)
+    api = RestSwaggerAPI(swagger, app)
+    @api.model({'id': int, 'name': str})
+    class Item(object): pass
+    for i in range(count):
+        def handler(id, limit=10):
+            return {'id': id, 'name': 'item'}
+        handler.__name__ = 'handler%d' % i
+        api.get('Api%d' % (i % apis), '/resource%d/{id}' % i, 'Endpoint %d' % i,
+            Signature().path('id', type=int).query('limit', type=int).returns(Item))(handler)
+    return app, swagger, api
+
+def main(counts=(100, 1000)):
+    results = {}
+    for count in counts:
+        app, swagger, api = build(count)
+        start = time.time()
+        api.setup()
+        swagger.setup()
+        setup = time.time() - start
+        client = app.test_client()
+        start = time.time()
+        client.get('/meta/resources/Api0')
+        first = time.time() - start
+        start = time.time()
+        for name in api.apis: client.get('/meta/resources/%s' % name)
+        spec = time.time() - start
+        start = time.time()
+        client.get('/meta/resources')
+        listing = time.time() - start
+        print '%5d endpoints: setup %8.1f ms first resource %7.1f ms all resources %8.1f ms listing %6.1f ms' % (
+            count, setup * 1e3, first * 1e3, spec * 1e3, listing * 1e3)
+        results[str(count)] = {'setup_ms': setup * 1e3, 'first_resource_ms': first * 1e3,
+            'all_resources_ms': spec * 1e3, 'listing_ms': listing * 1e3}
+    return results
+
+if __name__ == '__main__':
+    main()
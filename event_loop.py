@@ -0,0 +1,61 @@
+import os, threading
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+def is_coroutine_function(function):
+    if asyncio is None: return False
+    return asyncio.iscoroutinefunction(getattr(function, 'im_func', function))
+
+class EventLoopThread(object):
+    """ An asyncio event loop running on its own daemon thread, shared by
+    every request thread that dispatches a coroutine handler. The loop is
+    started lazily and restarted after a fork. """
+
+    def __init__(self, name='flask-swagger-loop'):
+        self.name = name
+        self.lock = threading.Lock()
+        self.loop = None
+        self.pid = None
+
+    def start(self):
+        with self.lock:
+            if self.loop is None or self.pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(target=self.run_forever, args=(loop, ready), name=self.name)
+                thread.daemon = True
+                thread.start()
+                ready.wait()
+                self.loop = loop
+                self.pid = os.getpid()
+        return self.loop
+
+    def run_forever(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def run(self, coroutine, timeout=None):
+        """ Runs coroutine on the loop and blocks the calling thread until it
+        completes, returning its result or raising its exception. """
+        loop = self.loop if self.pid == os.getpid() else self.start()
+        done = threading.Event()
+        tasks = []
+        def schedule():
+            ensure_future = getattr(asyncio, 'ensure_future', None) or getattr(asyncio, 'async')
+            task = ensure_future(coroutine, loop=loop)
+            task.add_done_callback(lambda task: done.set())
+            tasks.append(task)
+        loop.call_soon_threadsafe(schedule)
+        if not done.wait(timeout):
+            loop.call_soon_threadsafe(lambda: tasks and tasks[0].cancel())
+            raise RuntimeError('Coroutine did not complete within %s seconds' % (timeout))
+        return tasks[0].result()
+
+event_loop = EventLoopThread()
@@ -0,0 +1,44 @@
+import os, threading
+from multiprocessing.pool import ThreadPool
+
+class Executor(object):
+    """ A thread pool shared by every route of a RestSwaggerAPI. Handlers
+    declaring an executor argument receive it to fan out calls to
+    independent backends. Calls run outside the request context.
+
+    The pool is created on first use and again after a fork. """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pid = None
+
+    def thread_pool(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pool = ThreadPool(self.max_workers)
+                self.pid = os.getpid()
+        return self.pool
+
+    def submit(self, function, *args, **kwargs):
+        """ Runs function on the pool, returning an AsyncResult whose get()
+        returns its result or raises its exception. """
+        return self.thread_pool().apply_async(function, args, kwargs)
+
+    def map(self, function, values, timeout=None):
+        return self.thread_pool().map_async(function, values).get(timeout)
+
+    def gather(self, *functions, **kwargs):
+        """ Calls each function concurrently and returns their results in
+        order. timeout applies to each result. """
+        results = [self.submit(function) for function in functions]
+        return [result.get(kwargs.get('timeout')) for result in results]
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None and self.pid == os.getpid():
+                self.pool.close()
+                self.pool.join()
+            self.pool = None
+            self.pid = None
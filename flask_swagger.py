@@ -1,13 +1,31 @@
-import types, json, re, traceback, inspect
-from datetime import datetime
+import types, json, re, traceback, inspect, logging, threading, itertools
+from multiprocessing.pool import ThreadPool
 from swagger_ui import SwaggerAPI
+from json_codec import get_codec, iter_json_array, iter_json_lines
+from metrics import Metrics, Timer
+from profiler import Profiler
+from event_loop import event_loop, is_coroutine_function
+from response_cache import ResponseCache
+from http_utils import CORS, Compression, not_modified, held_etag, add_version, partial_response
+from admission import Admission
+from executor import Executor
+from swagger_types import TypeConverter, register_type, resolve_type
 import flask
 from flask.ext import restful
 from flask.ext.restful import reqparse
 import werkzeug.exceptions
 import werkzeug.wrappers
+import werkzeug.urls
+import werkzeug.routing
 
-debug = False
+class_types = (type, types.ClassType)
+ndjson_mimetypes = ('application/x-ndjson', 'application/jsonlines', 'application/x-jsonlines')
+path_parameter_pattern = re.compile('{([^}]*)}')
+rule_converters = {int: 'int', long: 'int'}
+# Headers of the batch request that do not apply to its operations, which are
+# encoded into the batch response as they are.
+batch_dropped_headers = ('content-length', 'content-type', 'accept-encoding', 'range')
+booleans = {'true': True, 'false': False, '1': True, '0': False, 'yes': True, 'no': False}
 
 class Unauthorized(werkzeug.exceptions.Unauthorized):
     description = 'Unauthorized'
@@ -18,6 +36,20 @@ class Unauthorized(werkzeug.exceptions.Unauthorized):
 
 flask.abort.mapping.update({401: Unauthorized})
 
+class ValidationError(werkzeug.exceptions.BadRequest):
+    """ A request body, or query, that does not match its model, answered
+    with the list of {field, message} errors as JSON. """
+    def __init__(self, errors, message='Invalid request body'):
+        super(ValidationError, self).__init__()
+        self.errors = errors
+        self.message = message
+    def get_body(self, environ=None):
+        return json.dumps({'message': self.message, 'errors': self.errors})
+    def get_headers(self, environ=None):
+        return [('Content-Type', 'application/json')]
+
+max_validation_errors = 20
+
 class SignatureItem(object):
     def __init__(self, name, *args, **kwargs):
         self.name = name
@@ -28,13 +60,108 @@ class SignatureItem(object):
         self.type = kwargs['type']
         self.help = help
 
+class QueryParser(object):
+    """ Parses the query string for a list of SignatureItems in one pass over
+    request.args. Errors abort with the same 400 body as reqparse. Signatures
+    using reqparse options beyond these keep using reqparse. """
+    options = frozenset(['type', 'required', 'action', 'default', 'help'])
+    @classmethod
+    def supports(cls, parameters):
+        for parameter in parameters:
+            if parameter.args or not cls.options.issuperset(parameter.kwargs): return False
+            if parameter.action not in (None, 'store', 'append'): return False
+        return True
+    @staticmethod
+    def converter(t, name):
+        if t in (int, long, float, str, unicode): return t
+        def convert(value):
+            try:
+                return t(value, name, '=')
+            except TypeError:
+                try:
+                    return t(value, name)
+                except TypeError:
+                    return t(value)
+        return convert
+    def __init__(self, parameters):
+        self.arguments = tuple((parameter.name, self.converter(parameter.type, parameter.name), parameter.required,
+            parameter.action == 'append', parameter.kwargs.get('default'), parameter.kwargs.get('help'))
+            for parameter in parameters)
+    def parse(self, args):
+        result = {}
+        for name, convert, required, append, default, help in self.arguments:
+            values = args.getlist(name)
+            if values:
+                try:
+                    values = [convert(value) for value in values]
+                except Exception, e:
+                    restful.abort(400, message=help if help is not None else str(e))
+                result[name] = values if append else values[0]
+            elif required:
+                restful.abort(400, message=help if help is not None else
+                    u'Missing required parameter %s in the query string' % (name))
+            elif callable(default): result[name] = default()
+            else: result[name] = default
+        return result
+
+class Page(object):
+    """ A page of results returned by a paginated handler that reads limit
+    and cursor itself. cursor is the opaque cursor of the next page, None
+    on the last one. """
+    def __init__(self, items, cursor=None):
+        self.items = items
+        self.cursor = cursor
+
+class Pagination(object):
+    """ Declared limit / cursor pagination. Handlers that do not take limit or
+    cursor return every result and get them sliced, with offsets for
+    cursors. The next cursor is sent in the X-Next-Cursor and Link headers. """
+    def __init__(self, limit=20, max_limit=100):
+        self.limit = limit
+        self.max_limit = max_limit
+    def bind(self, arguments):
+        limit = arguments.get('limit')
+        if limit is None: limit = self.limit
+        if limit < 1: raise ValidationError([{'field': 'limit', 'message': 'Expected a positive limit'}], 'Invalid query')
+        arguments['limit'] = min(limit, self.max_limit)
+    def page(self, values, arguments, plan):
+        if isinstance(values, Page): return values.items, values.cursor
+        if plan.pages: return values, None
+        limit = arguments['limit']
+        try:
+            offset = int(arguments.get('cursor') or 0)
+            if offset < 0: raise ValueError(offset)
+        except ValueError:
+            raise ValidationError([{'field': 'cursor', 'message': 'Invalid cursor'}], 'Invalid query')
+        if isinstance(values, (list, tuple)): items = list(values[offset:offset + limit + 1])
+        else: items = list(itertools.islice(values, offset, offset + limit + 1))
+        if len(items) <= limit: return items, None
+        return items[:limit], str(offset + limit)
+    def link(self, response, cursor):
+        args = flask.request.args.copy()
+        args['cursor'] = cursor
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = '<%s?%s>; rel="next"' % (flask.request.base_url, werkzeug.urls.url_encode(args))
+        return response
+
 class Signature(object):
     def __init__(self, *args, **kwargs):
         self.return_type = None
+        self.return_stream = False
+        self.response_cache = None
+        self.etag_function = None
+        self.last_modified_function = None
+        self.pagination = None
+        self.field_selection = False
         self.body_type = None
+        self.body_unpack = False
+        self.body_variable = 'body'
+        self.body_stream = False
+        self.body_batch_size = None
         self.parser = reqparse.RequestParser(*args, **kwargs)
         self.path_parameters = {}
         self.query_parameters = []
+        self.query_parser = None
     def path(self, *args, **kwargs):
         item = SignatureItem(*args, **kwargs)
         self.path_parameters[item.name] = item
@@ -42,25 +169,153 @@ class Signature(object):
     def query(self, *args, **kwargs):
         self.query_parameters.append(SignatureItem(*args, **kwargs))
         return self
-    def setup(self):
+    def setup(self, codec=None):
         for parameter in self.query_parameters:
             self.parser.add_argument(parameter.name, *parameter.args, **parameter.kwargs)
-    def returns(self, model):
+        if QueryParser.supports(self.query_parameters):
+            self.query_parser = QueryParser(self.query_parameters)
+        self.body_decoder = compile_from_json(self.body_type, codec) if self.body_type else None
+        self.body_validator = compile_validator(self.body_type) if self.body_type else None
+        if self.body_stream:
+            element_type = self.body_type[0] if isinstance(self.body_type, list) else self.body_type
+            self.body_element_decoder = compile_from_json(element_type, codec)
+            self.body_element_validator = compile_validator(element_type)
+        self.return_encoder = compile_to_json(self.return_type, codec) if self.return_type else None
+        self.return_element_encoder = None
+        if isinstance(self.return_type, list):
+            self.return_element_encoder = compile_to_json(self.return_type[0], codec)
+        self.accept_ranges = self.return_type in (None, str)
+        self.projection_model = None
+        self.projections = {}
+        if self.field_selection:
+            element_type = self.return_type[0] if isinstance(self.return_type, list) else self.return_type
+            if not isinstance(getattr(element_type, 'model', None), Model):
+                raise MalformSignatureException('fields() needs a model or list of models to return, not %r' % (self.return_type,))
+            self.projection_model = element_type.model
+        self.etag_plan = CallPlan(self.etag_function, self) if self.etag_function else None
+        self.last_modified_plan = CallPlan(self.last_modified_function, self) if self.last_modified_function else None
+    def returns(self, model, stream=None):
+        """ stream=True always streams list results, None streams them only when
+        the handler returns an iterator rather than a list or tuple. """
         self.return_type = model
+        self.return_stream = stream
+        return self
+    def paginate(self, limit=20, max_limit=100):
+        """ Adds the optional limit and cursor query parameters, returning a
+        page of at most limit results, see Pagination. """
+        self.pagination = Pagination(limit, max_limit)
+        self.query('limit', type=int, required=False, help='Results per page, at most %d' % (max_limit))
+        self.query('cursor', type=str, required=False, help='The cursor of the page, from X-Next-Cursor')
+        return self
+    def fields(self):
+        """ Adds the optional fields query parameter, a comma separated list of
+        the members of the returned model to encode, and no others. """
+        self.field_selection = True
+        self.query('fields', type=str, required=False, help='Comma separated members to return')
         return self
-    def body(self, klass, unpack=False, variable='body'):
+    def encoders(self, arguments):
+        """ The return encoder and element encoder for the requested fields. """
+        fields = arguments.get('fields') if self.projection_model else None
+        if not fields: return self.return_encoder, self.return_element_encoder
+        names = frozenset(name.strip() for name in fields.split(',') if name.strip())
+        encoders = self.projections.get(names)
+        if encoders is None:
+            unknown = sorted(names.difference(self.projection_model.model))
+            if unknown:
+                raise ValidationError([{'field': 'fields', 'message': 'Unknown field %s' % (name)} for name in unknown],
+                    'Invalid query')
+            element = self.projection_model.projection(names)
+            if isinstance(self.return_type, list): encoders = (lambda v: [element(v1) for v1 in v], element)
+            else: encoders = (element, None)
+            if len(self.projections) >= 64: self.projections.clear()
+            self.projections[names] = encoders
+        return encoders
+    def streams(self, response):
+        if not isinstance(self.return_type, list) or self.return_stream is False: return False
+        return self.return_stream or not isinstance(response, (list, tuple))
+    def body(self, klass, unpack=False, variable='body', stream=False, batch_size=None):
+        """ stream=True passes the handler a generator decoding a top level
+        JSON array, or newline delimited JSON, incrementally from the request
+        stream. batch_size groups the decoded values into lists. """
         self.body_unpack = unpack
         self.body_variable = variable
         self.body_type = klass
+        self.body_stream = stream
+        self.body_batch_size = batch_size
+        return self
+    def iter_body(self, request, codec):
+        if request.mimetype in ndjson_mimetypes: values = iter_json_lines(request.stream, codec.loads)
+        else: values = iter_json_array(request.stream)
+        decoder = self.body_element_decoder
+        validator = self.body_element_validator
+        if validator: values = (self.validate(value, validator) for value in values)
+        try:
+            if not self.body_batch_size:
+                for value in values:
+                    yield decoder(value) if decoder and value is not None else value
+                return
+            batch = []
+            for value in values:
+                batch.append(decoder(value) if decoder and value is not None else value)
+                if len(batch) == self.body_batch_size:
+                    yield batch
+                    batch = []
+            if batch: yield batch
+        except ValueError:
+            flask.abort(400)
+    def validate(self, value, validator=None):
+        """ Raises ValidationError unless the decoded JSON value matches the
+        body type, checked before any conversion. """
+        validator = validator or self.body_validator
+        if validator is None or value is None: return value
+        errors = []
+        validator(value, '', errors)
+        if errors: raise ValidationError(errors[:max_validation_errors])
+        return value
+    def decode(self, value):
+        """ Validates and converts a decoded JSON body. """
+        self.validate(value)
+        if self.body_decoder is None or value is None: return value
+        try:
+            return self.body_decoder(value)
+        except (ValueError, TypeError, ArithmeticError), e:
+            raise ValidationError([{'field': '', 'message': str(e)}])
+    def conditional(self, etag=None, last_modified=None):
+        """ Declares functions of the request arguments, bound like the
+        handler's, returning the current ETag or last modified datetime of
+        the resource. They run before the handler, and a GET that already
+        holds that version gets a 304 without running it. """
+        self.etag_function = etag
+        self.last_modified_function = last_modified
+        return self
+    def version(self, arguments):
+        if self.etag_plan is None and self.last_modified_plan is None: return None
+        etag = self.etag_plan(arguments) if self.etag_plan else None
+        last_modified = self.last_modified_plan(arguments) if self.last_modified_plan else None
+        return etag, last_modified
+    def cache(self, ttl=60, vary=(), max_entries=1024, backend=None):
+        """ Memoizes the serialized response keyed by the parsed arguments and
+        the vary request headers, for GET endpoints only since the request
+        body is not part of the key. """
+        self.response_cache = ResponseCache(ttl, vary, max_entries, backend)
         return self
     def parse(self):
+        if self.query_parser: return self.query_parser.parse(flask.request.args)
         result = self.parser.parse_args()
         return result
 
 class MalformSignatureException(StandardError): pass
 
+def path_decoder(t):
+    """ The conversion of a path parameter matched as a string by its rule,
+    or None to pass it as a string. """
+    if not isinstance(t, class_types) or issubclass(t, basestring): return None
+    if issubclass(t, bool): return lambda v: booleans[v.lower()]
+    return resolve_type(t).decode
+
 class ResourceMethod(object):
-    def __init__(self, swagger_api, method, name, view_name, url, description, signature, auth, notes, responses):
+    def __init__(self, swagger_api, method, name, view_name, url, description, signature, auth, notes, responses,
+            max_concurrency=None, queue_timeout=None, rate_limit=None, compress=True):
         self.swagger_api = swagger_api
         self.method = method
         self.url = url
@@ -70,6 +325,23 @@ class ResourceMethod(object):
         self.view_name = view_name
         self.notes = notes
         self.responses = responses
+        self.histograms = None
+        self.profiles = None
+        self.compress = compress
+        self.rule = None
+        self.path_converters = ()
+        self.admission = None
+        if max_concurrency or rate_limit:
+            self.admission = Admission(max_concurrency, queue_timeout, rate_limit)
+            self.responses = dict(self.responses)
+            if max_concurrency: self.responses.setdefault(503, 'Too many concurrent requests')
+            if rate_limit: self.responses.setdefault(429, 'Rate limit exceeded')
+        if signature.body_type and not 400 in self.responses:
+            self.responses = dict(self.responses)
+            self.responses[400] = 'Invalid request body'
+        if (signature.etag_function or signature.last_modified_function) and not 304 in self.responses:
+            self.responses = dict(self.responses)
+            self.responses[304] = 'Not modified'
         self.response_methods = []
         for key,value in self.responses.items():
             self.response_methods.append({
@@ -77,27 +349,48 @@ class ResourceMethod(object):
                 'message': value
             })
     def flask_url(self):
-        swagger_parameters = re.findall('{[^}]*}', self.url)
-        swagger_parameters = [parameter[1:-1] for parameter in swagger_parameters]
-        url = self.url
+        if self.rule is None: self.compile_url()
+        return self.rule
+    def compile_url(self):
+        """ Builds the Flask rule for the URL, and the converters of the path
+        parameters that the rule can only match as strings. """
+        swagger_parameters = path_parameter_pattern.findall(self.url)
         for parameter_name, parameter in self.signature.path_parameters.items():
             if not parameter_name in swagger_parameters: 
                 raise MalformSignatureException('%s from signature is not in the URL %s for %s' % (parameter_name, self.url, self.function))
         for parameter_name in swagger_parameters:
             if not parameter_name in self.signature.path_parameters: 
                 raise MalformSignatureException('%s from URL %s is not in the signature for %s' % (parameter_name, self.url, self.function))
-            parameter = self.signature.path_parameters[parameter_name]
-            flask_parameter = '<string:%s>' % (parameter_name)
-            if parameter.type in (int, long): flask_parameter = '<int:%s>' % (parameter_name)
-            if parameter.type == float: flask_parameter = '<float%s>' % (parameter_name)
-            url = url.replace('{%s}' % (parameter_name), flask_parameter)
-        return self.swagger_api.url_prefix + url
+        path_converters = []
+        def flask_parameter(match):
+            parameter = self.signature.path_parameters[match.group(1)]
+            converter = rule_converters.get(parameter.type)
+            if converter is None:
+                converter = 'string'
+                decoder = path_decoder(parameter.type)
+                if decoder: path_converters.append((parameter.name, decoder))
+            return '<%s:%s>' % (converter, parameter.name)
+        self.rule = self.swagger_api.url_prefix + path_parameter_pattern.sub(flask_parameter, self.url)
+        self.path_converters = tuple(path_converters)
+    def convert_path(self, kwargs):
+        for name, decoder in self.path_converters:
+            try:
+                kwargs[name] = decoder(kwargs[name])
+            except (ValueError, TypeError, KeyError, ArithmeticError):
+                flask.abort(404)
+        return kwargs
     def swagger_url(self):
         return self.url
     def setup(self):
-        self.signature.setup()
+        if self.signature.response_cache is not None and self.method != 'get':
+            raise MalformSignatureException('cache() is for GET methods, not %s %s' % (self.method.upper(), self.url))
+        self.compile_url()
+        self.signature.setup(self.swagger_api.codec)
+        executor = self.swagger_api.executor
+        self.plan = CallPlan(self.function, self.signature, {'executor': executor} if executor else None)
     def __call__(self, function):
         self.function = function
+        self.coroutine = is_coroutine_function(function)
         if type(function) == types.MethodType:
             function.im_func.signature = self.signature
             function.im_func.resource_method = self
@@ -106,15 +399,63 @@ class ResourceMethod(object):
             function.resource_method = self
         return function
 
+class CallPlan(object):
+    """ Argument binding for a resource method, compiled once at setup so the
+    request path does not have to introspect the function. injected values
+    are passed to the arguments of the same name that are not parameters
+    of the signature. """
+    def __init__(self, function, signature, injected=None):
+        function_arg_spec = inspect.getargspec(function)
+        args = function_arg_spec.args
+        if type(function) == types.MethodType: args = args[1:]
+        defaults = function_arg_spec.defaults or ()
+        required = len(args) - len(defaults)
+        self.function = function
+        self.positional = tuple(args[:required])
+        self.optional = tuple(args[required:])
+        self.required = frozenset(self.positional)
+        self.defaults = dict(zip(self.optional, defaults))
+        self.keywords = function_arg_spec.keywords is not None
+        self.pages = 'limit' in args or 'cursor' in args
+        self.body_type = signature.body_type
+        self.body_raw = signature.body_type == str
+        self.body_unpack = signature.body_unpack
+        self.body_variable = signature.body_variable
+        parameters = set(signature.path_parameters) | set(parameter.name for parameter in signature.query_parameters)
+        if signature.body_type: parameters.add(signature.body_variable)
+        self.injected = dict((name, value) for name, value in (injected or {}).items()
+            if name in args and not name in parameters)
+    def bind_body(self, arguments, body):
+        if self.body_unpack and not self.body_raw:
+            if hasattr(body, '__slots__'): body = dict((name, getattr(body, name)) for name in body.__slots__)
+            arguments.update(body)
+        else: arguments[self.body_variable] = body
+    def __call__(self, arguments):
+        if self.injected: arguments.update(self.injected)
+        try:
+            argument_list = [arguments[name] for name in self.positional]
+        except KeyError, e:
+            raise ValueError('Required parameter "%s" is missing' % (e.args[0]))
+        if self.keywords:
+            argument_dict = dict(arguments)
+            for name in self.positional: del argument_dict[name]
+        else:
+            argument_dict = dict((name, arguments[name]) for name in self.optional if name in arguments)
+        return self.function(*argument_list, **argument_dict)
+
 class Member(object):
     def __init__(self, type=None, required=False):
         self.type = type
+        self.required = required
 
 class Model(object):
-    def __init__(self, model):
+    def __init__(self, model, slots=False):
         self.model = {}
         self.member_model = {}
         self.required = []
+        self.codec = None
+        self.slots = slots
+        self.record = None
         for key, value in model.items():
             if isinstance(value, Member):
                 self.model[key] = value.type
@@ -125,6 +466,7 @@ class Model(object):
                 self.model[key] = value
                 self.required.append(key)
     def __call__(self, klass):
+        if self.slots: klass = self.record = record_class(klass, sorted(self.model))
         self.klass = klass
         klass.model = self
         return klass
@@ -132,6 +474,7 @@ class Model(object):
         for name, attr_type in self.model.items():
             value = values.get(name)
             values[name] = from_json(attr_type, value)
+        if self.record: return self.record(**dict((name, values[name]) for name in self.model))
         return values
     def json_from_object(self, object):
         response = {}
@@ -157,6 +500,27 @@ class Model(object):
         for name, attr_type in self.model.items():
             value = json.get(name)
             setattr(instance, name, from_json(attr_type, value))
+    def compile(self, codec=None):
+        """ Generates the specialised encoder and decoder for this model. The
+        generic json_from_object / objects_from_json remain the reference. """
+        if codec is not None: self.codec = codec
+        fields = sorted(self.model.items())
+        self.encode = compile_model_encoder([(name, compile_to_json(t, self.codec)) for name, t in fields], self.record)
+        self.decode = compile_model_decoder([(name, compile_from_json(t, self.codec)) for name, t in fields], self.record)
+        self.validate = compile_model_validator([(name, compile_validator(t)) for name, t in fields], sorted(self.required))
+    def encode(self, object):
+        self.compile()
+        return self.encode(object)
+    def projection(self, names):
+        """ Generates an encoder of only the named members. """
+        fields = sorted((name, t) for name, t in self.model.items() if name in names)
+        return compile_model_encoder([(name, compile_to_json(t, self.codec)) for name, t in fields], self.record)
+    def decode(self, values):
+        self.compile()
+        return self.decode(values)
+    def validate(self, values, path, errors):
+        self.compile()
+        return self.validate(values, path, errors)
 
 def get_swagger_type(t, model=False, basic=False, required=False):
     if model:
@@ -169,56 +533,25 @@ def get_swagger_type(t, model=False, basic=False, required=False):
             return {'type': retval, 'allowableValues':t, 'required':required}
         return {'type': retval, 'required':required}
     def basic_type(ot):
-        if not isinstance(ot, type): return type(ot).__name__
-        if issubclass(ot, basestring):
-            return 'string'
-        elif issubclass(ot, datetime):
-            return 'Date'
-        elif issubclass(ot, float):
-            return 'float'
-        elif issubclass(ot, bool):
-            return 'bool'
-        elif issubclass(ot, int):
-            return 'int'
-        elif issubclass(ot, long):
-            return 'int'
-        else: return ot.__name__
+        if not isinstance(ot, class_types): return type(ot).__name__
+        return resolve_type(ot).swagger_type
     if isinstance(t, basestring): return t
-    elif isinstance(t, type): return basic_type(t)
+    elif isinstance(t, class_types): return basic_type(t)
     elif isinstance(t, list):
         return '[%s]' % (basic_type(t[0]))
     elif isinstance(t, dict):
-        return '{%s}' % (basic_type(t.items()[0]))
+        return '{%s}' % (basic_type(t.values()[0]))
     elif isinstance(t, tuple):
         return basic_type(type(t[0]))
     return type(t).__name__
 
 def from_json(t, v, basic=False):
     if v == None: return None
-    def from_basic_type(t0, v0):
-        if not isinstance(t0, type): return v0
-        if issubclass(t0, basestring):
-            return v0
-        elif issubclass(t0, datetime):
-            if isinstance(v0, datetime): return v0
-            return datetime.strptime(v0, "%Y-%m-%dT%H:%M:%S" )
-        elif issubclass(t0, float):
-            if isinstance(v0, float): return v0
-            return float(v0)
-        elif issubclass(t0, bool):
-            if isinstance(v0, bool): return v0
-            return bool(v0)
-        elif issubclass(t0, int):
-            if isinstance(v0, int): return v0
-            return int(v0)
-        elif issubclass(t0, long):
-            if isinstance(v0, long): return v0
-            return long(v0)
-        elif hasattr(t0, 'model'):
-            return t0.model.objects_from_json(v0)
-        else: return v0
     if isinstance(t, basestring): return v
-    elif isinstance(t, type): return from_basic_type(t, v)
+    elif isinstance(t, class_types):
+        decode = resolve_type(t).decode
+        if decode is None: return v
+        return decode(v)
     elif isinstance(t, list): 
         response = []
         for v1 in v: response.append(from_json(t[0], v1))
@@ -230,25 +563,11 @@ def from_json(t, v, basic=False):
     return v
 
 def to_json(t, v, basic=False):
-    def from_basic_type(t0, v0):
-        if not isinstance(t0, type): return str(v0)
-        if issubclass(t0, basestring):
-            return v0
-        elif issubclass(t0, datetime):
-            return v0.strftime("%Y-%m-%dT%H:%M:%S.%f")
-        elif issubclass(t0, float):
-            return v0
-        elif issubclass(t0, bool):
-            return v0
-        elif issubclass(t0, int):
-            return v0
-        elif issubclass(t0, long):
-            return v0
-        elif hasattr(t0, 'model'):
-            return t0.model.json_from_object(v0)
-        else: return str(v0)
     if isinstance(t, basestring): return str(v)
-    elif isinstance(t, type): return from_basic_type(t, v)
+    elif isinstance(t, class_types):
+        encode = resolve_type(t).encode
+        if encode is None: return v
+        return encode(v)
     elif isinstance(t, list): 
         response = []
         for v1 in v: response.append(to_json(t[0], v1))
@@ -257,198 +576,564 @@ def to_json(t, v, basic=False):
         response = {}
         for k1, v1 in v.items(): response[k1] = to_json(t.values()[0], v1)
         return response
+    elif isinstance(t, tuple):
+        return to_json(type(t[0]), v)
+
+def compile_to_json(t, codec=None):
+    """ Resolves the to_json conversion for t once. Returns None when values
+    of t are already JSON compatible, or handled by the codec, and can be
+    passed through. """
+    if isinstance(t, basestring): return str
+    elif isinstance(t, class_types): return resolve_type(t).encoder(codec)
+    elif isinstance(t, list):
+        element = compile_to_json(t[0], codec)
+        if element is None: return list
+        return lambda v: [element(v1) for v1 in v]
+    elif isinstance(t, dict):
+        element = compile_to_json(t.values()[0], codec)
+        if element is None: return dict
+        return lambda v: dict((k1, element(v1)) for k1, v1 in v.iteritems())
+    elif isinstance(t, tuple):
+        return compile_to_json(type(t[0]), codec)
+    return lambda v: None
+
+def compile_from_json(t, codec=None):
+    """ Resolves the from_json conversion for t once. Returns None when values
+    can be passed through unchanged. """
+    if isinstance(t, basestring): return None
+    elif isinstance(t, class_types): return resolve_type(t).decoder(codec)
+    elif isinstance(t, list):
+        element = compile_from_json(t[0], codec)
+        if element is None: return list
+        return lambda v: [None if v1 is None else element(v1) for v1 in v]
+    elif isinstance(t, dict):
+        element = compile_from_json(t.values()[0], codec)
+        if element is None: return dict
+        return lambda v: dict((k1, None if v1 is None else element(v1)) for k1, v1 in v.iteritems())
+    return None
+
+def field_path(path, name):
+    if not path: return name
+    return '%s.%s' % (path, name)
+
+def compile_validator(t):
+    """ Resolves a function(value, path, errors) appending an error for every
+    part of a decoded JSON value that does not match t, or None when any
+    value is accepted. Null values are not checked. """
+    if isinstance(t, basestring): return None
+    elif isinstance(t, class_types): return resolve_type(t).validator()
+    elif isinstance(t, list):
+        element = compile_validator(t[0])
+        def validate(value, path, errors):
+            if not isinstance(value, list): return errors.append({'field': path, 'message': 'Expected a list'})
+            if element is None: return
+            for i, v in enumerate(value):
+                if v is not None: element(v, '%s[%d]' % (path, i), errors)
+                if len(errors) >= max_validation_errors: return
+        return validate
+    elif isinstance(t, dict):
+        element = compile_validator(t.values()[0])
+        def validate(value, path, errors):
+            if not isinstance(value, dict): return errors.append({'field': path, 'message': 'Expected an object'})
+            if element is None: return
+            for k, v in value.iteritems():
+                if v is not None: element(v, field_path(path, k), errors)
+                if len(errors) >= max_validation_errors: return
+        return validate
+    elif isinstance(t, tuple):
+        allowed = frozenset(t)
+        message = 'Expected one of %s' % (', '.join(map(str, t)))
+        def validate(value, path, errors):
+            try:
+                if value in allowed: return
+            except TypeError:
+                pass
+            errors.append({'field': path, 'message': message})
+        return validate
+    return None
+
+def compile_model_validator(fields, required):
+    fields = [(name, validator) for name, validator in fields if validator is not None]
+    def validate(values, path, errors):
+        if not isinstance(values, dict): return errors.append({'field': path, 'message': 'Expected an object'})
+        for name in required:
+            if values.get(name) is None: errors.append({'field': field_path(path, name), 'message': 'Required'})
+        for name, validator in fields:
+            value = values.get(name)
+            if value is not None: validator(value, field_path(path, name), errors)
+    return validate
+
+def record_class(klass, names):
+    """ Builds a __slots__ class with the methods of klass and one slot per
+    model member, constructed positionally in the order of names. """
+    for name in names:
+        if not re.match('^[A-Za-z_][A-Za-z0-9_]*$', name):
+            raise ValueError('%s cannot be a slot of %s' % (name, klass.__name__))
+    namespace = dict((key, value) for key, value in vars(klass).items()
+        if key not in ('__dict__', '__weakref__') and key not in names)
+    source = ['def __init__(self, %s):' % ''.join('%s=None, ' % name for name in names)]
+    source += ['    self.%s = %s' % (name, name) for name in names] or ['    pass']
+    exec '\n'.join(source) in namespace
+    namespace['__slots__'] = tuple(names)
+    namespace['__getstate__'] = lambda self: tuple(getattr(self, name) for name in names)
+    namespace['__setstate__'] = lambda self, state: [setattr(self, name, value) for name, value in zip(names, state)]
+    bases = tuple(base for base in klass.__bases__ if base is not object) or (object,)
+    return type(klass.__name__, bases, namespace)
+
+def compile_model_encoder(fields, record=None):
+    names = dict(('e%d' % i, encoder) for i, (name, encoder) in enumerate(fields))
+    names['record'] = record
+    source = ['def encode(object):']
+    if record is not None:
+        source += ['    if type(object) is record:']
+        source += ['        v%d = object.%s' % (i, name) for i, (name, encoder) in enumerate(fields)]
+        source += ['        pass', '    elif isinstance(object, dict):']
+    else:
+        source += ['    if isinstance(object, dict):']
+    source += ['        v%d = object.get(%r)' % (i, name) for i, (name, encoder) in enumerate(fields)]
+    source += ['    else:']
+    source += ['        v%d = getattr(object, %r, None)' % (i, name) for i, (name, encoder) in enumerate(fields)]
+    source += ['    return {%s}' % ', '.join(
+        '%r: v%d' % (name, i) if encoder is None else '%r: None if v%d is None else e%d(v%d)' % (name, i, i, i)
+        for i, (name, encoder) in enumerate(fields))]
+    if not fields: source[1:] = ['    return {}']
+    exec '\n'.join(source) in names
+    return names['encode']
+
+def compile_model_decoder(fields, record=None):
+    """ Decodes into the values dict in place, or straight into a new record
+    instance for models declared with slots. """
+    names = dict(('d%d' % i, decoder) for i, (name, decoder) in enumerate(fields))
+    names['record'] = record
+    source = ['def decode(values):']
+    for i, (name, decoder) in enumerate(fields):
+        source.append('    v%d = values.get(%r)' % (i, name))
+        if record is not None: value = 'v%d' % (i)
+        else: value = 'values[%r]' % (name)
+        if decoder is None: source.append('    %s = v%d' % (value, i))
+        else: source.append('    %s = None if v%d is None else d%d(v%d)' % (value, i, i, i))
+    if record is not None: source.append('    return record(%s)' % ', '.join('v%d' % i for i in range(len(fields))))
+    else: source.append('    return values')
+    exec '\n'.join(source) in names
+    return names['decode']
+
+def stream_json(values, encoder=None, dumps=json.dumps, chunk_size=65536):
+    """ Serializes an iterable as a JSON array one element at a time, yielding
+    chunks of roughly chunk_size bytes. Elements are encoded as the compiled
+    list encoder does, None included. """
+    chunk = ['[']
+    size = 1
+    separator = ''
+    for value in values:
+        if encoder: value = encoder(value)
+        data = dumps(value)
+        chunk.append(separator)
+        chunk.append(data)
+        separator = ','
+        size += len(data) + 1
+        if size >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    chunk.append(']')
+    yield ''.join(chunk)
 
 class Caller(object):
-    def __init__(self):
+    """ The view of one URL, dispatching on the HTTP method to its resource
+    methods. HEAD and OPTIONS are answered from the method table without
+    calling a handler, any other method without one gets a 405. """
+    provide_automatic_options = False
+    def __init__(self, cors=None):
         self.methods = {}
+        self.allow = 'OPTIONS'
+        self.cors = cors
+    def add(self, resource_method):
+        self.methods[resource_method.method] = resource_method
+        methods = set(method.upper() for method in self.methods)
+        methods.add('OPTIONS')
+        if 'GET' in methods: methods.add('HEAD')
+        self.allow = ', '.join(sorted(methods))
     def __call__(self, *args, **kwargs):
-        if debug:
-            print '-'*160
-            print flask.request
-        def call():
-            method = flask.request.method.lower()
-            assert method in self.methods
-            method = self.methods[method]
-            try:
-                if method.auth: method.auth()
-            except:
-                traceback.print_exc()
-                raise
-            arguments = method.signature.parse()
-            arguments.update(kwargs)
-            if method.signature.body_type:
-                if method.signature.body_type != str:
-                    try:
-                        body = json.loads(flask.request.data)
-                    except ValueError, e:
-                        flask.abort(400)
-                    body = from_json(method.signature.body_type, body)
-                    if method.signature.body_unpack: arguments.update(body)
-                    else: arguments[method.signature.body_variable] = body
-                else:
-                    body = flask.request.data
-                    arguments[method.signature.body_variable] = body
-            argument_list = []
-            argument_dict = {}
-            function_arg_spec = inspect.getargspec(method.function)
-            index = 0
-            start = 0
-            if type(method.function) == types.MethodType: start = 1
-            function_arg_spec_defaults = function_arg_spec.defaults
-            if function_arg_spec_defaults == None: function_arg_spec_defaults = []
-            remaining = arguments.copy()
-            for function_argument in function_arg_spec.args[start:]: 
-                if index < len(function_arg_spec.args) - len(function_arg_spec_defaults):
-                    if not function_argument in arguments:
-                        raise ValueError('Required parameter "%s" is missing' % (function_argument))
-                    argument_list.append(arguments[function_argument])
-                    del remaining[function_argument]
-                else:
-                    argument_dict[function_argument] = arguments[function_argument]
-                    del remaining[function_argument]
-                index += 1
-            if function_arg_spec.keywords:
-                argument_dict.update(remaining)
-            response = method.function(*argument_list, **argument_dict)
-            if response == None: return flask.Response()
-            if isinstance(response, (flask.Response, werkzeug.wrappers.Response)): 
-                return response
-            if method.signature.return_type:
-                response = to_json(method.signature.return_type, response)
-            if isinstance(response, str): return flask.Response(response)
-            if isinstance(response, (dict, list, tuple)): return flask.Response(json.dumps(response))
-            #if isinstance(response, object): 
-            #    if hasattr(type(response), 'model'):
-            #        model = type(response).model
-            #        return flask.jsonify(model.json_from_object(response))
-            return flask.Response(str(response))
-        response = call()
-        if debug:
-            print '-'*160
-            print response
-            print response.data
-            print '='*160
+        method = self.methods.get(flask.request.method.lower())
+        if method is None: response = self.answer(flask.request.method, kwargs)
+        elif method.profiles is None: response = self.timed(method, kwargs)
+        else: response = method.swagger_api.profiler.profile(method.profiles, self.timed, method, kwargs)
+        if self.cors: self.cors.apply(flask.request, response)
+        compression = method and method.compress and method.swagger_api.compression
+        if compression: compression.apply(flask.request, response)
         return response
+    def timed(self, method, kwargs):
+        if method.histograms is None: return self.call(method, kwargs, None)
+        timer = Timer(method.histograms)
+        try:
+            return self.call(method, kwargs, timer)
+        finally:
+            timer.finish()
+    def answer(self, request_method, kwargs):
+        if request_method == 'OPTIONS':
+            response = flask.Response()
+            if self.cors: self.cors.preflight(flask.request, response, self.allow)
+        elif request_method == 'HEAD' and 'get' in self.methods:
+            response = self.call(self.methods['get'], kwargs, None, self.head)
+        else:
+            response = flask.Response(status=405)
+        response.headers['Allow'] = self.allow
+        return response
+    def head(self, method, kwargs, timer):
+        """ Answers HEAD once GET's auth, admission and path conversion
+        passed, without calling its handler. """
+        if method.path_converters: method.convert_path(kwargs)
+        return flask.Response(iter(()), mimetype='application/json')
+    def call(self, method, kwargs, timer, handle=None):
+        if handle is None: handle = self.handle
+        identity = None
+        try:
+            if method.auth: identity = method.auth()
+        except:
+            traceback.print_exc()
+            raise
+        if timer: timer.mark('auth')
+        admission = method.admission
+        if admission is None: return handle(method, kwargs, timer)
+        if identity is None: identity = flask.request.remote_addr
+        rejection = admission.admit(identity)
+        if rejection is not None: return rejection
+        try:
+            response = handle(method, kwargs, timer)
+        except:
+            admission.release()
+            raise
+        if response.is_streamed: response.call_on_close(admission.release)
+        else: admission.release()
+        return response
+    def handle(self, method, kwargs, timer):
+        if method.path_converters: kwargs = method.convert_path(kwargs)
+        arguments = method.signature.parse()
+        arguments.update(kwargs)
+        if timer: timer.mark('parse')
+        signature = method.signature
+        version = signature.version(arguments)
+        if version is None: version = (None, None)
+        elif not_modified(flask.request, *version):
+            return add_version(flask.Response(status=304), held_etag(flask.request, version[0]), version[1])
+        cache = signature.response_cache
+        if cache is not None:
+            compression = method.compress and method.swagger_api.compression
+            response = cache.respond(cache.key(arguments), lambda: self.dispatch(method, arguments, timer), compression)
+        else:
+            response = self.dispatch(method, arguments, timer)
+        if response.status_code == 200: add_version(response, *version)
+        if signature.accept_ranges: response = partial_response(flask.request, response, *version)
+        return response
+    def dispatch(self, method, arguments, timer):
+        plan = method.plan
+        codec = method.swagger_api.codec
+        if plan.body_type:
+            if method.signature.body_stream:
+                body = method.signature.iter_body(flask.request, codec)
+            elif not plan.body_raw:
+                try:
+                    body = codec.loads(flask.request.data)
+                except ValueError, e:
+                    flask.abort(400)
+                if timer: timer.mark('body_decode')
+                body = method.signature.decode(body)
+                if timer: timer.mark('from_json')
+            else:
+                body = flask.request.data
+            plan.bind_body(arguments, body)
+        signature = method.signature
+        if signature.pagination: signature.pagination.bind(arguments)
+        response = plan(arguments)
+        if method.coroutine: response = method.swagger_api.event_loop.run(response)
+        if timer: timer.mark('handler')
+        if response == None: return flask.Response()
+        if isinstance(response, (flask.Response, werkzeug.wrappers.Response)): 
+            return response
+        cursor = None
+        if signature.pagination: response, cursor = signature.pagination.page(response, arguments, plan)
+        response = self.encode(method, response, signature.encoders(arguments), timer)
+        if cursor is not None: signature.pagination.link(response, cursor)
+        return response
+    def encode(self, method, response, encoders, timer):
+        codec = method.swagger_api.codec
+        encoder, element_encoder = encoders
+        if method.signature.streams(response):
+            body = stream_json(response, element_encoder, codec.dumps)
+            return flask.Response(flask.stream_with_context(body), mimetype='application/json')
+        if encoder: response = encoder(response)
+        if timer: timer.mark('to_json')
+        if isinstance(response, str): response = flask.Response(response)
+        elif isinstance(response, (dict, list, tuple)): response = flask.Response(codec.dumps(response))
+        else: response = flask.Response(str(response))
+        if timer: timer.mark('serialize')
+        return response
+
+class BatchExecutor(object):
+    """ Runs batched {method, path, query, body} operations through the
+    Caller of the matching route inside a request context of their own,
+    without a WSGI round trip. """
+    def __init__(self, swagger_api, max_workers=None):
+        self.swagger_api = swagger_api
+        self.max_workers = max_workers
+        self.pool = None
+    def __call__(self, operations):
+        request = flask.request
+        headers = [(key, value) for key, value in request.headers
+            if key.lower() not in batch_dropped_headers and not key.lower().startswith('if-')]
+        url_root = request.url_root
+        run = lambda operation: self.run(operation, url_root, headers)
+        if self.max_workers and len(operations) > 1:
+            if self.pool is None: self.pool = ThreadPool(self.max_workers)
+            results = self.pool.map(run, operations)
+        else:
+            results = [run(operation) for operation in operations]
+        codec = self.swagger_api.codec
+        return flask.Response(codec.dumps(results), mimetype='application/json')
+    def run(self, operation, base_url, headers):
+        app = self.swagger_api.app
+        codec = self.swagger_api.codec
+        body = operation.get('body')
+        context = app.test_request_context(operation.get('path') or '/',
+            base_url=base_url,
+            method=(operation.get('method') or 'GET').upper(),
+            query_string=operation.get('query') or {},
+            data=codec.dumps(body) if body is not None else None,
+            headers=headers)
+        with context:
+            try:
+                if flask.request.routing_exception: raise flask.request.routing_exception
+                view = app.view_functions[flask.request.url_rule.endpoint]
+                if not isinstance(view, Caller): flask.abort(404)
+                method = view.methods.get(flask.request.method.lower())
+                if method is not None and getattr(method.function, 'batch', False): flask.abort(400)
+                response = app.make_response(view(**flask.request.view_args))
+            except werkzeug.exceptions.HTTPException, e:
+                response = e.get_response(flask.request.environ)
+            except Exception, e:
+                logging.getLogger(__name__).exception('Batch operation %s failed', operation.get('path'))
+                response = flask.Response(str(e), status=500)
+            data = response.get_data()
+            response.close()
+        try:
+            data = codec.loads(data)
+        except ValueError:
+            pass
+        return {
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'body': data
+        }
 
 class RestSwaggerAPI(object):
-    def __init__(self, swagger, app, url_prefix=''):
+    def __init__(self, swagger, app, url_prefix='', codec=None, metrics=None, event_loop=event_loop, executor=None,
+            cors=None, compression=None, profiler=None):
+        """ executor=True creates a default Executor shared by the routes,
+        see executor.py. cors is True, a CORS instance or the list of allowed
+        origins. compression is True or a Compression instance, and profiler
+        True or a Profiler, served at /meta/profiles. Pass a Profiler with an
+        auth function when /meta is reachable by untrusted clients. """
         self.swagger = swagger
         self.app = app
+        self.event_loop = event_loop
+        self.executor = Executor() if executor is True else executor
+        if cors is True: cors = CORS()
+        elif cors and not isinstance(cors, CORS): cors = CORS(cors)
+        self.cors = cors
+        self.compression = Compression() if compression is True else compression
+        self.codec = get_codec(codec)
+        self.metrics = Metrics() if metrics is True else metrics
+        self.profiler = Profiler() if profiler is True else profiler
         self.swagger_models = []
         self.urls = {}
         self.url_prefix = url_prefix
         self.apis = {}
         self.view_names = {}
+        self.callers = {}
+        self.registered = set()
+        self.compiled_models = []
+        self.swagger_apis = {}
+        self.swagger_model_specs = {}
+        self.lock = threading.RLock()
         app.before_request(RestSwaggerAPI.before_request)
     @staticmethod
     def before_request():       
         pass
-    def method(self, method, name, view_name, url, description, signature, auth, notes, responses):
+    def method(self, method, name, view_name, url, description, signature, auth, notes, responses, **options):
+        """ options are max_concurrency, queue_timeout and rate_limit, a rate
+        or (rate, burst) per identity returned by auth, see admission.py, and
+        compress=False to opt out of response compression. """
         if not name in self.apis: self.apis[name] = []
         if not url in self.urls: self.urls[url] = []
-        resource_method = ResourceMethod(self, method,name,view_name,url,description,signature, auth, notes, responses)
+        resource_method = ResourceMethod(self, method,name,view_name,url,description,signature, auth, notes, responses, **options)
         self.urls[url].append(resource_method)
         self.apis[name].append(resource_method)
         return resource_method
-    def model(self, model):
-        model = Model(model)
+    def model(self, model, slots=False):
+        """ slots=True replaces the decorated class with a compact __slots__
+        record class built from the declared members. """
+        model = Model(model, slots)
+        model.codec = self.codec
         self.swagger_models.append(model)
         return model
-    def get(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}):
-        return self.method('get',name, view_name, url, description, signature, auth, notes, responses)
-    def post(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}):
-        return self.method('post',name, view_name, url, description, signature, auth, notes, responses)
-    def put(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}):
-        return self.method('put',name, view_name, url, description, signature, auth, notes, responses)
-    def delete(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}):
-        return self.method('delete',name, view_name, url, description, signature, auth, notes, responses)
+    def get(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}, **options):
+        return self.method('get',name, view_name, url, description, signature, auth, notes, responses, **options)
+    def post(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}, **options):
+        return self.method('post',name, view_name, url, description, signature, auth, notes, responses, **options)
+    def put(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}, **options):
+        return self.method('put',name, view_name, url, description, signature, auth, notes, responses, **options)
+    def delete(self, name, url, description, signature, auth=None, view_name=None, notes='', responses={}, **options):
+        return self.method('delete',name, view_name, url, description, signature, auth, notes, responses, **options)
+    def batch(self, url='/batch', name='Batch', auth=None, max_workers=None):
+        """ Registers a POST endpoint that executes a JSON array of operations
+        against the other routes, optionally in parallel on max_workers threads. """
+        @self.model({
+            'method': Member(str),
+            'path': str,
+            'query': Member({str: str}),
+            'body': Member(dict),
+            })
+        class BatchOperation(object): pass
+        @self.model({
+            'status': int,
+            'headers': {str: str},
+            'body': Member(dict),
+            })
+        class BatchResult(object): pass
+        executor = BatchExecutor(self, max_workers)
+        def batch(operations):
+            return executor(operations)
+        # Operations cannot be batches, whose operations would wait on the
+        # pool threads running them.
+        batch.batch = True
+        return self.post(name, url, 'Execute several operations in one request',
+            Signature().body([BatchOperation], variable='operations').returns([BatchResult]),
+            auth=auth, view_name='batch')(batch)
     def resource(self, url, signature):
         if not url in self.urls: self.urls[url] = SwaggerResource(self, url)
         resource = SwaggerResource(self, url)
         resource.api = self
         return resource
     def setup(self):
-        apis = {}
-        models = {}
+        """ Registers the routes of every resource method added since the last
+        call. The Swagger spec is only described when it is first requested. """
+        for model in self.swagger_models[len(self.compiled_models):]:
+            model.compile(self.codec)
+            self.compiled_models.append(model)
+        if self.metrics: self.swagger.add_view('/metrics', 'metrics', self.metrics.view)
+        if self.profiler: self.swagger.add_view('/profiles', 'profiles', self.profiler.view)
+        self.swagger.add_view('/stats', 'stats', self.stats)
         for url, resource_methods in self.urls.items():
-            caller = Caller()
-            methods = []
+            resource_methods = [resource_method for resource_method in resource_methods
+                if not resource_method in self.registered]
+            if not resource_methods: continue
+            routed = url in self.callers
+            if not routed:
+                self.callers[url] = (Caller(self.cors), self.unique_view_name(resource_methods[-1]))
+            caller, view_name = self.callers[url]
             for resource_method in resource_methods:
-                caller.methods[resource_method.method] = resource_method
-                methods.append(resource_method.method.upper())
+                caller.add(resource_method)
                 resource_method.setup()
-
-            view_name = resource_method.view_name
-            if view_name == None: view_name = resource_method.function.__name__
-            if view_name in self.view_names:
-                i = 0
-                while True:
-                    vn = view_name + str(i)
-                    if not vn in self.view_names: break
-                    i += 1
-                view_name = vn
-            self.view_names[view_name] = True
-            self.app.add_url_rule(resource_method.flask_url(), view_name, caller, methods=methods)
-        for model in self.swagger_models:
-            model_properties = {}
-            for item, value in model.model.items():
-                required=item in model.required
-                model_properties[item] = get_swagger_type(value, model=True, required=required)
-            models[model.klass.__name__] = {
-                'id': model.klass.__name__,
-                'properties': model_properties
-            }
-        for name, resource_methods in self.apis.items():
-            api = SwaggerAPI(self.swagger, '', url_prefix=self.url_prefix)
-            api.models = models
-            self.swagger.apis[name] = api
-            for resource_method in resource_methods:
-                parameters = []
-                if resource_method.signature.body_type:
-                    parameters.append({
-                        'description': '',
-                        'paramType': 'body',
-                        'required': True,
-                        'allowMultiple': False,
-                        'dataType': get_swagger_type(resource_method.signature.body_type)
-                    })
-                for parameter_name, parameter in resource_method.signature.path_parameters.items():
-                    parameters.append({
-                        'name': parameter.name,
-                        'description': parameter.name,
-                        'paramType': 'path',
-                        'required': parameter.required,
-                        'allowMultiple': False,
-                        'dataType': get_swagger_type(parameter.type)
-                    })
-                for parameter in resource_method.signature.query_parameters:
-                    parameters.append({
-                        'name': parameter.name,
-                        'description': parameter.name,
-                        'paramType': 'query',
-                        'required': parameter.required,
-                        'allowMultiple': parameter.action == 'append',
-                        'dataType': get_swagger_type(parameter.type)
-                    })
-                resource = {
-                    'path': resource_method.url,
-                    'description': resource_method.description,
-                    'operations': [
-                        {
-                            'httpMethod': resource_method.method,
-                            'nickname': resource_method.function.__name__,
-                            'summary': resource_method.description,
-                            'parameters': parameters,
-                            'notes': resource_method.notes,
-                            'responseMessages':resource_method.response_methods,
-                            'responseClass':get_swagger_type(resource_method.signature.return_type),
-                        }
-                    ]
+                if self.metrics:
+                    resource_method.histograms = self.metrics.endpoint(view_name, resource_method.method)
+                if self.profiler:
+                    resource_method.profiles = self.profiler.endpoint(view_name, resource_method.method)
+                self.registered.add(resource_method)
+            if not routed:
+                # A rule of any method, so that the Caller answers HEAD,
+                # OPTIONS and 405 from its method table.
+                self.app.url_map.add(werkzeug.routing.Rule(resource_method.flask_url(), endpoint=view_name))
+                self.app.view_functions[view_name] = caller
+        with self.lock:
+            for name, resource_methods in self.apis.items():
+                if not name in self.swagger_apis:
+                    api = SwaggerAPI(name, '', url_prefix=self.url_prefix, codec=self.codec)
+                    api.models = self.swagger_model_specs
+                    api.builder = self.describe
+                    self.swagger_apis[name] = api
+                    self.swagger.add_api(name, api)
+                self.swagger_apis[name].builder = self.describe
+        self.swagger.invalidate()
+    def warmup(self):
+        """ Describes every Swagger API now rather than on its first request. """
+        for api in self.swagger_apis.values():
+            if api.builder: api.builder(api)
+    def unique_view_name(self, resource_method):
+        view_name = resource_method.view_name
+        if view_name == None: view_name = resource_method.function.__name__
+        if view_name in self.view_names:
+            i = 0
+            while True:
+                vn = view_name + str(i)
+                if not vn in self.view_names: break
+                i += 1
+            view_name = vn
+        self.view_names[view_name] = True
+        return view_name
+    def describe(self, api):
+        """ Adds the models and operations not yet in the spec of api. """
+        with self.lock:
+            for model in self.swagger_models:
+                if model.klass.__name__ in self.swagger_model_specs: continue
+                model_properties = {}
+                for item, value in model.model.items():
+                    required=item in model.required
+                    model_properties[item] = get_swagger_type(value, model=True, required=required)
+                self.swagger_model_specs[model.klass.__name__] = {
+                    'id': model.klass.__name__,
+                    'properties': model_properties
                 }
-                found = False
-                for swagger_api in api.apis:
-                    if swagger_api['path'] == resource_method.url:
-                        swagger_api['operations'].append(resource['operations'][0])
-                        found = True
-                        break
-                if not found: api.apis.append(resource)
\ No newline at end of file
+            for resource_method in self.apis[api.name]:
+                if resource_method in api.described: continue
+                api.add_operation(resource_method.url, resource_method.description,
+                    self.describe_operation(resource_method))
+                api.described.add(resource_method)
+            api.builder = None
+    def describe_operation(self, resource_method):
+        parameters = []
+        if resource_method.signature.body_type:
+            parameters.append({
+                'description': '',
+                'paramType': 'body',
+                'required': True,
+                'allowMultiple': False,
+                'dataType': get_swagger_type(resource_method.signature.body_type)
+            })
+        for parameter_name, parameter in resource_method.signature.path_parameters.items():
+            parameters.append({
+                'name': parameter.name,
+                'description': parameter.name,
+                'paramType': 'path',
+                'required': parameter.required,
+                'allowMultiple': False,
+                'dataType': get_swagger_type(parameter.type)
+            })
+        for parameter in resource_method.signature.query_parameters:
+            parameters.append({
+                'name': parameter.name,
+                'description': parameter.name,
+                'paramType': 'query',
+                'required': parameter.required,
+                'allowMultiple': parameter.action == 'append',
+                'dataType': get_swagger_type(parameter.type)
+            })
+        operation = {
+            'httpMethod': resource_method.method,
+            'nickname': resource_method.function.__name__,
+            'summary': resource_method.description,
+            'parameters': parameters,
+            'notes': resource_method.notes,
+            'responseMessages':resource_method.response_methods,
+            'responseClass':get_swagger_type(resource_method.signature.return_type),
+        }
+        if resource_method.admission: operation['limits'] = resource_method.admission.describe()
+        return operation
+    def stats(self):
+        """ Admission limits and current counts of every limited route. """
+        stats = {}
+        for view_name, view in self.app.view_functions.items():
+            if not isinstance(view, Caller): continue
+            for method_name, resource_method in view.methods.items():
+                if resource_method.admission:
+                    stats.setdefault(view_name, {})[method_name] = resource_method.admission.stats()
+        return flask.Response(self.codec.dumps(stats), mimetype='application/json')
\ No newline at end of file
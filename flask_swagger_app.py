@@ -7,6 +7,7 @@ from flask.ext import restful
 from flask_swagger import *
 from devops.projects.webapp import *
 from swagger_ui import SwaggerUI, Swagger
+from prefork import run_prefork
 from flask_swagger import SwaggerAPI
 import flaskext.auth
 from flaskext.auth import Auth, AuthUser, login_required, login, logout, get_current_user_data, Role, Permission, permission_required
@@ -45,6 +46,11 @@ def print_locations(app):
 def run_swagger_app(app, bindings):
     print_locations(app)
     if 'GUNICORN_CLIENT' in os.environ: return
+    elif os.environ.get('PREFORK',None) == '1':
+        return run_prefork(app, bindings,
+            workers=int(os.environ.get('WORKERS', 4)),
+            threads=int(os.environ.get('WORKER_THREADS', 8)),
+            max_requests=int(os.environ.get('MAX_REQUESTS', 0)))
     elif os.environ.get('GUNICORN',None) == '1' :
         return run_gunicorn_wsgi(app, bindings, get_flask_locations(app))
     elif os.environ.get('WSGIREF',None) == '1':
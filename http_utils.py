@@ -0,0 +1,212 @@
+import calendar, gzip, hashlib, zlib
+from datetime import datetime
+from StringIO import StringIO
+from flask import Response
+
+encodings = ('gzip', 'deflate')
+
+def compress(data, encoding, level=6):
+    if encoding == 'gzip':
+        buffer = StringIO()
+        f = gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=level, mtime=0)
+        f.write(data)
+        f.close()
+        return buffer.getvalue()
+    if encoding == 'deflate':
+        return zlib.compress(data, level)
+    return data
+
+def compress_stream(chunks, encoding, level=6):
+    """ Compresses an iterable of chunks incrementally, flushing after each so
+    the client receives every chunk as it is produced. """
+    wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, unicode): chunk = chunk.encode('utf-8')
+            if chunk: yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'): chunks.close()
+
+def negotiate_encoding(request, available=encodings):
+    """ The best content coding the client accepts out of available, or None. """
+    return request.accept_encodings.best_match(available)
+
+class CachedBody(object):
+    """ A serialized response body together with its strong ETag and
+    precompressed variants, so repeated requests cost a dict lookup. """
+
+    def __init__(self, data, mimetype='application/json', encodings=encodings, level=6,
+            headers=None):
+        if isinstance(data, unicode): data = data.encode('utf-8')
+        self.data = data
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(data).hexdigest()
+        self.headers = headers or {}
+        self.variants = {None: data}
+        for encoding in encodings:
+            self.variants[encoding] = compress(data, encoding, level)
+        self.encodings = tuple(encodings)
+
+    def response(self, request):
+        encoding = negotiate_encoding(request, self.encodings)
+        etag = self.etag if encoding is None else '%s-%s' % (self.etag, encoding)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], mimetype=self.mimetype)
+            if encoding: response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        for key, value in self.headers.items():
+            response.headers[key] = value
+        return response
+
+def http_datetime(value):
+    """ A naive UTC datetime in whole seconds from a datetime, naive ones
+    being UTC already, or from a timestamp. """
+    if value is None: return None
+    if isinstance(value, (int, long, float)): return datetime.utcfromtimestamp(int(value))
+    if value.tzinfo is not None: value = datetime.utcfromtimestamp(calendar.timegm(value.utctimetuple()))
+    return value.replace(microsecond=0)
+
+def not_modified(request, etag=None, last_modified=None):
+    """ Whether a GET or HEAD request already holds the representation with
+    etag and last_modified, or a compressed variant of it. If-None-Match
+    takes precedence over If-Modified-Since. """
+    if request.method not in ('GET', 'HEAD'): return False
+    if request.if_none_match:
+        if etag is None: return False
+        return any(request.if_none_match.contains_weak(variant)
+            for variant in [etag] + ['%s-%s' % (etag, encoding) for encoding in encodings])
+    if request.if_modified_since and last_modified is not None:
+        return http_datetime(last_modified) <= request.if_modified_since
+    return False
+
+def held_etag(request, etag):
+    """ The variant of etag named by If-None-Match, which a 304 echoes. """
+    if etag is None: return None
+    for variant in ['%s-%s' % (etag, encoding) for encoding in encodings]:
+        if request.if_none_match.contains_weak(variant): return variant
+    return etag
+
+def add_version(response, etag=None, last_modified=None):
+    if etag is not None: response.set_etag(etag)
+    if last_modified is not None: response.last_modified = http_datetime(last_modified)
+    return response
+
+def partial_response(request, response, etag=None, last_modified=None):
+    """ Narrows a complete 200 response to the single byte range requested,
+    as a 206, or a 416 when the range is past the end. Multiple ranges, and
+    an If-Range that is no longer current, get the complete response. """
+    if response.status_code != 200 or response.is_streamed: return response
+    response.accept_ranges = 'bytes'
+    range = request.range
+    if range is None or request.method != 'GET': return response
+    if range.units != 'bytes' or len(range.ranges) != 1: return response
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag: return response
+    if if_range.date is not None and (last_modified is None or http_datetime(last_modified) != if_range.date):
+        return response
+    data = response.get_data()
+    bounds = range.range_for_length(len(data))
+    if bounds is None:
+        unsatisfiable = Response(status=416)
+        unsatisfiable.headers['Content-Range'] = 'bytes */%d' % (len(data))
+        return unsatisfiable
+    start, stop = bounds
+    response.set_data(data[start:stop])
+    response.status_code = 206
+    response.headers['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, len(data))
+    return response
+
+class BodyCache(object):
+    """ CachedBody instances keyed by host base URI. The number of hosts is
+    bounded since the Host header is client controlled. """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def get(self, key, build):
+        body = self.entries.get(key)
+        if body is None:
+            body = build()
+            if len(self.entries) >= self.max_entries: self.entries.clear()
+            self.entries[key] = body
+        return body
+
+    def clear(self):
+        self.entries.clear()
+
+class CORS(object):
+    """ Cross origin resource sharing headers. origins is '*' or a list of
+    allowed origins. headers lists the request headers a preflight allows,
+    None allows whatever the preflight asks for. """
+
+    def __init__(self, origins='*', headers=None, expose_headers=(), credentials=False, max_age=600):
+        self.origins = origins
+        self.headers = headers
+        self.expose_headers = expose_headers
+        self.credentials = credentials
+        self.max_age = max_age
+
+    def allowed_origin(self, request):
+        origin = request.headers.get('Origin')
+        if origin is None: return None
+        if self.origins == '*': return origin if self.credentials else '*'
+        if origin in self.origins: return origin
+        return None
+
+    def apply(self, request, response):
+        origin = self.allowed_origin(request)
+        if origin is None: return response
+        response.headers['Access-Control-Allow-Origin'] = origin
+        if origin != '*': response.vary.add('Origin')
+        if self.credentials: response.headers['Access-Control-Allow-Credentials'] = 'true'
+        if self.expose_headers: response.headers['Access-Control-Expose-Headers'] = ', '.join(self.expose_headers)
+        return response
+
+    def preflight(self, request, response, allow):
+        if request.headers.get('Access-Control-Request-Method') is None: return response
+        if self.allowed_origin(request) is None: return response
+        response.headers['Access-Control-Allow-Methods'] = allow
+        if self.headers is not None: headers = ', '.join(self.headers)
+        else: headers = request.headers.get('Access-Control-Request-Headers')
+        if headers: response.headers['Access-Control-Allow-Headers'] = headers
+        response.headers['Access-Control-Max-Age'] = str(self.max_age)
+        return response
+
+class Compression(object):
+    """ Negotiated content coding of textual responses of at least min_size
+    bytes. Streamed responses are compressed as they are produced whatever
+    their size. Responses that already have a Content-Encoding are left. """
+
+    compressible = ('text/', 'application/json', 'application/javascript', 'application/xml',
+        'application/x-ndjson')
+
+    def __init__(self, min_size=1024, level=6, encodings=encodings):
+        self.min_size = min_size
+        self.level = level
+        self.encodings = tuple(encodings)
+
+    def apply(self, request, response):
+        if response.status_code == 304:
+            response.vary.add('Accept-Encoding')
+            return response
+        if response.status_code != 200 or 'Content-Encoding' in response.headers: return response
+        if not (response.mimetype or '').startswith(self.compressible): return response
+        if not response.is_streamed and response.calculate_content_length() < self.min_size: return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request, self.encodings)
+        if encoding is None or request.method == 'HEAD': return response
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, self.level)
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compress(response.get_data(), encoding, self.level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag: response.set_etag('%s-%s' % (etag, encoding), weak)
+        return response
@@ -0,0 +1,151 @@
+import json
+from datetime import datetime
+
+datetime_format = "%Y-%m-%dT%H:%M:%S.%f"
+
+def format_datetime(value):
+    return '%04d-%02d-%02dT%02d:%02d:%02d.%06d' % (value.year, value.month, value.day,
+        value.hour, value.minute, value.second, value.microsecond)
+
+def parse_datetime(value):
+    """ Parses the datetime_format, with or without the fractional part. """
+    if len(value) >= 19 and value[4] == '-' and value[7] == '-' and value[13] == ':' and value[16] == ':':
+        try:
+            microsecond = 0
+            if len(value) > 20 and value[19] == '.': microsecond = int(value[20:26].ljust(6, '0'))
+            elif len(value) != 19: raise ValueError(value)
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]), microsecond)
+        except ValueError:
+            pass
+    if '.' in value: return datetime.strptime(value, datetime_format)
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+
+class JSONCodec(object):
+    """ The standard library json module. Datetimes are left in place by the
+    model encoders and formatted by the codec while dumping. """
+    name = 'json'
+    native_datetime = True
+
+    def __init__(self, module=json):
+        self.module = module
+
+    def default(self, value):
+        if isinstance(value, datetime): return format_datetime(value)
+        raise TypeError('%r is not JSON serializable' % (value,))
+
+    def loads(self, data):
+        return self.module.loads(data)
+
+    def dumps(self, value):
+        return self.module.dumps(value, default=self.default)
+
+    def encode_datetime(self, value):
+        return format_datetime(value)
+
+    def decode_datetime(self, value):
+        if isinstance(value, datetime): return value
+        return parse_datetime(value)
+
+class SimpleJSONCodec(JSONCodec):
+    name = 'simplejson'
+
+    def __init__(self):
+        import simplejson
+        super(SimpleJSONCodec, self).__init__(simplejson)
+
+class UJSONCodec(JSONCodec):
+    """ ujson has no default hook, so datetimes are formatted by the model
+    encoders instead. """
+    name = 'ujson'
+    native_datetime = False
+
+    def __init__(self):
+        import ujson
+        super(UJSONCodec, self).__init__(ujson)
+
+    def dumps(self, value):
+        return self.module.dumps(value)
+
+class ORJSONCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        super(ORJSONCodec, self).__init__(orjson)
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value):
+        return self.module.dumps(value, default=self.default, option=self.options)
+
+codecs = [ORJSONCodec, UJSONCodec, SimpleJSONCodec, JSONCodec]
+
+def get_codec(codec=None):
+    """ Resolves a codec instance from an instance, a codec name or 'auto' for
+    the fastest installed one. Missing modules fall back to the stdlib. """
+    if isinstance(codec, JSONCodec): return codec
+    if codec in (None, 'json'): return JSONCodec()
+    for klass in codecs:
+        if codec != 'auto' and klass.name != codec: continue
+        try:
+            return klass()
+        except ImportError:
+            pass
+    return JSONCodec()
+
+whitespace = ' \t\r\n'
+array_delimiters = whitespace + ',]'
+
+def iter_json_array(stream, chunk_size=65536):
+    """ Yields the elements of a top level JSON array as they are read from
+    stream, keeping only the undecoded remainder in memory. An element is
+    only yielded once the character after it is read, so that a number cut
+    by a chunk boundary is not decoded early. """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    expect = '['
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in whitespace:
+            position += 1
+        if position < len(buffer):
+            character = buffer[position]
+            if expect == '[':
+                if character != '[': raise ValueError('Expected a JSON array')
+                expect = 'first'
+                position += 1
+                continue
+            if expect == ',':
+                if character == ']': return
+                if character != ',': raise ValueError('Expected , or ] in JSON array')
+                expect = 'value'
+                position += 1
+                continue
+            if character == ']' and expect == 'first': return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof: raise
+            else:
+                if end < len(buffer) and buffer[end] in array_delimiters or eof:
+                    yield value
+                    position = end
+                    expect = ','
+                    continue
+        if eof: raise ValueError('Unterminated JSON array')
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def iter_json_lines(stream, loads=json.loads, chunk_size=65536):
+    """ Yields the values of newline delimited JSON read from stream. """
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        lines = (buffer + chunk).split('\n')
+        buffer = lines.pop() if chunk else ''
+        for line in lines:
+            if line.strip(): yield loads(line)
+        if not chunk: return
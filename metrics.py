@@ -0,0 +1,92 @@
+import bisect, json, thread, time
+from flask import Response, request
+
+buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+phases = ('auth', 'parse', 'body_decode', 'from_json', 'handler', 'to_json', 'serialize', 'total')
+
+class Histogram(object):
+    """ A latency histogram without locks: every thread records into its own
+    shard and readers sum the shards. """
+
+    def __init__(self, bounds=buckets):
+        self.bounds = bounds
+        self.shards = {}
+
+    def observe(self, value):
+        shard = self.shards.get(thread.get_ident())
+        if shard is None:
+            shard = self.shards[thread.get_ident()] = [0] * (len(self.bounds) + 1) + [0.0]
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """ Returns (counts per bucket including +Inf, total seconds). """
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for shard in self.shards.values():
+            for i in range(len(counts)): counts[i] += shard[i]
+            total += shard[-1]
+        return counts, total
+
+class Timer(object):
+    """ Records the time since the previous mark under each phase name. """
+
+    def __init__(self, histograms):
+        self.histograms = histograms
+        self.start = self.last = time.time()
+
+    def mark(self, phase):
+        now = time.time()
+        self.histograms[phase].observe(now - self.last)
+        self.last = now
+
+    def finish(self):
+        self.histograms['total'].observe(time.time() - self.start)
+
+class Metrics(object):
+    """ Per view name and HTTP method phase histograms, see Caller. """
+
+    def __init__(self, bounds=buckets):
+        self.bounds = bounds
+        self.endpoints = {}
+
+    def endpoint(self, view_name, method):
+        key = (view_name, method)
+        if not key in self.endpoints:
+            self.endpoints[key] = dict((phase, Histogram(self.bounds)) for phase in phases)
+        return self.endpoints[key]
+
+    def as_json(self):
+        data = {}
+        for (view_name, method), histograms in sorted(self.endpoints.items()):
+            for phase, histogram in histograms.items():
+                counts, total = histogram.snapshot()
+                if not sum(counts): continue
+                data.setdefault(view_name, {}).setdefault(method, {})[phase] = {
+                    'count': sum(counts),
+                    'sum': total,
+                    'buckets': zip(list(self.bounds) + ['+Inf'], counts)
+                }
+        return data
+
+    def as_prometheus(self):
+        name = 'flask_swagger_request_seconds'
+        lines = ['# HELP %s Time spent in each phase of a request.' % name,
+            '# TYPE %s histogram' % name]
+        for (view_name, method), histograms in sorted(self.endpoints.items()):
+            for phase in phases:
+                counts, total = histograms[phase].snapshot()
+                if not sum(counts): continue
+                labels = 'view="%s",method="%s",phase="%s"' % (view_name, method, phase)
+                cumulative = 0
+                for bound, count in zip(list(self.bounds) + ['+Inf'], counts):
+                    cumulative += count
+                    lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, bound, cumulative))
+                lines.append('%s_sum{%s} %f' % (name, labels, total))
+                lines.append('%s_count{%s} %d' % (name, labels, cumulative))
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        if request.args.get('format') == 'json':
+            return Response(json.dumps(self.as_json()), mimetype='application/json')
+        return Response(self.as_prometheus(), mimetype='text/plain; version=0.0.4')
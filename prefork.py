@@ -0,0 +1,179 @@
+import errno, gc, logging, os, select, signal, socket, threading, time
+from Queue import Queue
+from SocketServer import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+logger = logging.getLogger('flask_swagger.prefork')
+
+def parse_binding(bindings):
+    """ Accepts 'host:port', (host, port) or a list of those, of which the
+    first is used. """
+    if isinstance(bindings, list): bindings = bindings[0]
+    if isinstance(bindings, basestring):
+        host, _, port = bindings.rpartition(':')
+        return host or '0.0.0.0', int(port)
+    return bindings[0], int(bindings[1])
+
+def warmup(app):
+    """ Builds everything that is otherwise built lazily on first use, so
+    forked workers share it copy on write: compiled serializers and plans
+    from RestSwaggerAPI.setup() and the described Swagger specs. """
+    from flask_swagger import Caller
+    apis = set()
+    for view in app.view_functions.values():
+        if isinstance(view, Caller):
+            for resource_method in view.methods.values():
+                apis.add(resource_method.swagger_api)
+    for api in apis:
+        api.warmup()
+    gc.collect()
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.client_address[0], format % args)
+
+class ThreadPoolWSGIServer(ThreadingMixIn, WSGIServer):
+    """ A wsgiref server on an inherited listening socket, handing accepted
+    connections to a fixed pool of threads. Stops accepting after
+    max_requests connections, or when stop() is called, and drains. """
+    timeout = 1.0
+
+    def __init__(self, listener, app, threads=8, max_requests=0):
+        WSGIServer.__init__(self, listener.getsockname(), QuietHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listener
+        self.server_name = listener.getsockname()[0]
+        self.server_port = listener.getsockname()[1]
+        self.setup_environ()
+        self.set_app(app)
+        self.max_requests = max_requests
+        self.handled = 0
+        self.stopping = False
+        self.requests = Queue()
+        self.threads = [threading.Thread(target=self.process_requests) for i in range(threads)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def process_request(self, request, client_address):
+        self.handled += 1
+        if self.max_requests and self.handled >= self.max_requests: self.stopping = True
+        self.requests.put((request, client_address))
+
+    def process_requests(self):
+        while True:
+            request, client_address = self.requests.get()
+            if request is None: return
+            self.process_request_thread(request, client_address)
+
+    def shutdown_request(self, request):
+        try:
+            request.shutdown(socket.SHUT_WR)
+        except socket.error:
+            pass
+        request.close()
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def serve(self):
+        while not self.stopping:
+            try:
+                self.handle_request()
+            except (OSError, select.error), e:
+                if e.args[0] != errno.EINTR: raise
+        for thread in self.threads: self.requests.put((None, None))
+        for thread in self.threads: thread.join()
+
+class PreforkServer(object):
+    """ Binds the listening socket and warms the application in the parent,
+    then forks workers that share that state copy on write. Workers are
+    replaced when they exit, for instance after max_requests. SIGHUP
+    gracefully replaces every worker, SIGTERM and SIGINT shut down. """
+
+    def __init__(self, app, bindings='0.0.0.0:5000', workers=4, threads=8, max_requests=0,
+            backlog=128, graceful_timeout=30):
+        self.app = app
+        self.address = parse_binding(bindings)
+        self.workers = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.backlog = backlog
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.stopping = False
+        self.reloading = False
+
+    def listen(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(self.address)
+        listener.listen(self.backlog)
+        return listener
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.time()
+            return pid
+        try:
+            for signum in (signal.SIGHUP, signal.SIGCHLD): signal.signal(signum, signal.SIG_DFL)
+            server = ThreadPoolWSGIServer(self.listener, self.app, self.threads, self.max_requests)
+            signal.signal(signal.SIGTERM, server.stop)
+            signal.signal(signal.SIGINT, server.stop)
+            server.serve()
+        except Exception:
+            logger.exception('Worker %d failed', os.getpid())
+            os._exit(1)
+        os._exit(0)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError, e:
+                if e.errno == errno.ECHILD: return
+                raise
+            if not pid: return
+            self.children.pop(pid, None)
+
+    def signal_children(self, signum, pids=None):
+        for pid in list(self.children if pids is None else pids):
+            try:
+                os.kill(pid, signum)
+            except OSError:
+                pass
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def reload(self, *args):
+        self.reloading = True
+
+    def run(self):
+        self.listener = self.listen()
+        warmup(self.app)
+        logger.info('Listening on %s:%d with %d workers', self.address[0], self.address[1], self.workers)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.reload)
+        while not self.stopping:
+            self.reap()
+            if self.reloading:
+                self.reloading = False
+                old = list(self.children)
+                for i in range(self.workers): self.spawn()
+                self.signal_children(signal.SIGTERM, old)
+            while len(self.children) < self.workers and not self.stopping:
+                self.spawn()
+            time.sleep(0.5)
+        self.signal_children(signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout
+        while self.children and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.signal_children(signal.SIGKILL)
+        self.listener.close()
+
+def run_prefork(app, bindings, **kwargs):
+    return PreforkServer(app, bindings, **kwargs).run()
@@ -0,0 +1,155 @@
+import cProfile, json, os, pstats, random, sys, thread, threading, time
+from collections import deque
+from StringIO import StringIO
+from flask import Response, request
+
+def collapse(frame):
+    """ The stack of frame as one line of the collapsed format read by
+    flamegraph tools, outermost call first. """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+class StackSampler(object):
+    """ A daemon thread recording the collapsed stack of every thread inside
+    begin() / end() each interval seconds. It idles while there are none,
+    and is started again after a fork. """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.active = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+
+    def start(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.active = {}
+                sampler = threading.Thread(target=self.run, name='flask-swagger-sampler')
+                sampler.daemon = True
+                sampler.start()
+                self.pid = os.getpid()
+
+    def begin(self):
+        if self.pid != os.getpid(): self.start()
+        stacks = {}
+        self.active[thread.get_ident()] = stacks
+        self.wakeup.set()
+        return stacks
+
+    def end(self):
+        self.active.pop(thread.get_ident(), None)
+
+    def run(self):
+        while True:
+            if not self.active:
+                self.wakeup.clear()
+                if not self.active: self.wakeup.wait(1.0)
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, stacks in self.active.items():
+                frame = frames.get(ident)
+                if frame is None: continue
+                stack = collapse(frame)
+                stacks[stack] = stacks.get(stack, 0) + 1
+            del frames
+
+class Profiler(object):
+    """ Profiles a sample_rate fraction of requests with cProfile, and stack
+    samples every other request, keeping those slower than slow_threshold
+    seconds. The last capacity profiles of each view name and HTTP method
+    are kept, see Caller. Streamed responses are profiled until the handler
+    returns. Only the request path is recorded, not the query string.
+
+    Profiles expose code and timings, auth is a function run before serving
+    them like a route's, that aborts unauthorized requests. """
+
+    def __init__(self, sample_rate=0.01, slow_threshold=0.5, capacity=32, interval=0.005, auth=None):
+        self.sample_rate = sample_rate
+        self.auth = auth
+        self.slow_threshold = slow_threshold
+        self.capacity = capacity
+        self.sampler = StackSampler(interval)
+        self.endpoints = {}
+
+    def endpoint(self, view_name, method):
+        key = (view_name, method)
+        if not key in self.endpoints: self.endpoints[key] = deque(maxlen=self.capacity)
+        return self.endpoints[key]
+
+    def profile(self, profiles, function, *args):
+        start = time.time()
+        if self.sample_rate and random.random() < self.sample_rate:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(function, *args)
+            finally:
+                profiles.append(self.record(start, profile=profile))
+        if self.slow_threshold is None: return function(*args)
+        stacks = self.sampler.begin()
+        try:
+            return function(*args)
+        finally:
+            self.sampler.end()
+            if time.time() - start >= self.slow_threshold and stacks:
+                profiles.append(self.record(start, stacks=dict(stacks)))
+
+    def record(self, start, profile=None, stacks=None):
+        return {
+            'time': start,
+            'duration': time.time() - start,
+            'path': request.path,
+            'profile': profile,
+            'stacks': stacks,
+        }
+
+    def selected(self):
+        view_name = request.args.get('view')
+        method = request.args.get('method')
+        for (key_view, key_method), profiles in sorted(self.endpoints.items()):
+            if view_name and key_view != view_name or method and key_method != method: continue
+            for record in list(profiles):
+                yield key_view, key_method, record
+
+    def as_json(self):
+        return [{
+            'view': view_name,
+            'method': method,
+            'path': record['path'],
+            'time': record['time'],
+            'duration': record['duration'],
+            'kind': 'cprofile' if record['profile'] else 'stacks',
+        } for view_name, method, record in self.selected()]
+
+    def as_collapsed(self):
+        stacks = {}
+        for view_name, method, record in self.selected():
+            for stack, count in (record['stacks'] or {}).items():
+                stacks[stack] = stacks.get(stack, 0) + count
+        return ''.join('%s %d\n' % (stack, count) for stack, count in sorted(stacks.items()))
+
+    def as_pstats(self, sort='cumulative', limit=50):
+        profiles = [record['profile'] for view_name, method, record in self.selected() if record['profile']]
+        if not profiles: return 'No cProfile samples\n'
+        output = StringIO()
+        stats = pstats.Stats(profiles[0], stream=output)
+        for profile in profiles[1:]: stats.add(profile)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def view(self):
+        """ ?format=collapsed or pstats, otherwise a JSON list of the kept
+        profiles, narrowed by ?view= and ?method=. """
+        if self.auth: self.auth()
+        format = request.args.get('format')
+        if format == 'collapsed': return Response(self.as_collapsed(), mimetype='text/plain')
+        if format == 'pstats':
+            return Response(self.as_pstats(request.args.get('sort', 'cumulative'),
+                request.args.get('limit', 50, type=int)), mimetype='text/plain')
+        return Response(json.dumps(self.as_json()), mimetype='application/json')
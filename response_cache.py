@@ -0,0 +1,108 @@
+import threading, time
+from collections import OrderedDict
+from flask import request
+from http_utils import CachedBody
+
+class CacheBackend(object):
+    """ Storage interface for ResponseCache. Values are CachedBody instances,
+    which pickle, so a shared backend can serialize them. """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class LRUCache(CacheBackend):
+    """ In process least recently used cache with per entry expiry. """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None: return None
+            if entry[0] < time.time(): return None
+            self.entries[key] = entry
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time() + ttl, value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+
+class ResponseCache(object):
+    """ Memoizes the serialized response of an endpoint keyed by its parsed
+    arguments and the vary request headers. Concurrent misses for the same
+    key wait for a single computation. """
+
+    uncached_headers = ('content-length', 'etag', 'vary', 'set-cookie')
+
+    def __init__(self, ttl=60, vary=(), max_entries=1024, backend=None):
+        self.ttl = ttl
+        self.vary = tuple(vary)
+        self.backend = backend or LRUCache(max_entries)
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def key(self, arguments):
+        return '%s %s %r %r' % (request.method, request.endpoint, sorted(arguments.items()),
+            [request.headers.get(header) for header in self.vary])
+
+    def entry(self, response, compression=None):
+        """ The cached body of response, precompressed when compression
+        would compress it. """
+        if response.status_code != 200 or response.is_streamed: return None
+        headers = dict((key, value) for key, value in response.headers
+            if key.lower() not in self.uncached_headers)
+        headers['Vary'] = ', '.join(('Accept-Encoding',) + self.vary)
+        data = response.get_data()
+        if compression and len(data) >= compression.min_size and (response.mimetype or '').startswith(compression.compressible):
+            return CachedBody(data, response.mimetype, compression.encodings, compression.level, headers)
+        return CachedBody(data, response.mimetype, encodings=(), headers=headers)
+
+    def respond(self, key, compute, compression=None):
+        body = self.backend.get(key)
+        if body is not None: return body.response(request)
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader: flight = self.flights[key] = Flight()
+        if not leader:
+            flight.event.wait()
+            if flight.value is not None: return flight.value.response(request)
+            return compute()
+        try:
+            response = compute()
+            flight.value = self.entry(response, compression)
+            if flight.value is None: return response
+            self.backend.set(key, flight.value, self.ttl)
+            return flight.value.response(request)
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.event.set()
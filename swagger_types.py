@@ -0,0 +1,148 @@
+import inspect, re, threading, uuid
+from datetime import date, datetime
+from decimal import Decimal
+from json_codec import datetime_format, parse_datetime
+
+class TypeConverter(object):
+    """ How values of a type are named in the Swagger spec, validated and
+    converted to and from JSON. An encode or decode of None passes values
+    through, a check of None accepts any decoded JSON value. """
+
+    def __init__(self, swagger_type, encode=None, decode=None, check=None):
+        self.swagger_type = swagger_type
+        self.encode = encode
+        self.decode = decode
+        self.check = check
+
+    def encoder(self, codec=None):
+        """ The encode used by the compiled serializers of codec. """
+        return self.encode
+
+    def decoder(self, codec=None):
+        return self.decode
+
+    def validator(self):
+        """ A function(value, path, errors) appending an error for decoded
+        JSON values that decode would not accept, or None. """
+        check = self.check
+        if check is None: return None
+        message = 'Expected %s' % (self.swagger_type)
+        def validate(value, path, errors):
+            if not check(value): errors.append({'field': path, 'message': message})
+        return validate
+
+class DatetimeConverter(TypeConverter):
+    """ Datetimes are formatted by codecs that handle them natively. """
+
+    def __init__(self):
+        super(DatetimeConverter, self).__init__('Date', lambda v: v.strftime(datetime_format),
+            lambda v: v if isinstance(v, datetime) else parse_datetime(v),
+            json_check(basestring, r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?$'))
+
+    def encoder(self, codec=None):
+        if codec is None: return self.encode
+        if codec.native_datetime: return None
+        return codec.encode_datetime
+
+    def decoder(self, codec=None):
+        if codec is None: return self.decode
+        return codec.decode_datetime
+
+class ModelConverter(TypeConverter):
+    """ Classes decorated with RestSwaggerAPI.model. The reference encode and
+    decode are the generic Model methods, the compiled ones are generated. """
+
+    def __init__(self, klass):
+        model = klass.model
+        super(ModelConverter, self).__init__(klass.__name__, model.json_from_object, model.objects_from_json)
+        self.model = model
+
+    def encoder(self, codec=None):
+        return lambda v: self.model.encode(v)
+
+    def decoder(self, codec=None):
+        return lambda v: self.model.decode(v)
+
+    def validator(self):
+        return lambda value, path, errors: self.model.validate(value, path, errors)
+
+class TypeRegistry(object):
+    """ Maps classes to converters. A class without a converter of its own
+    resolves to the first registered class in its MRO, then to its model,
+    and otherwise is encoded with str. Resolutions are cached per class. """
+
+    def __init__(self):
+        self.converters = {}
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def register(self, klass, converter):
+        with self.lock:
+            self.converters[klass] = converter
+            self.cache = {}
+
+    def resolve(self, klass):
+        converter = self.cache.get(klass)
+        if converter is None:
+            converter = self.lookup(klass)
+            with self.lock:
+                self.cache[klass] = converter
+        return converter
+
+    def lookup(self, klass):
+        for base in inspect.getmro(klass):
+            if base in self.converters: return self.converters[base]
+        if hasattr(klass, 'model') and hasattr(klass.model, 'objects_from_json'): return ModelConverter(klass)
+        return TypeConverter(klass.__name__, str)
+
+def json_check(types, pattern=None):
+    """ Accepts decoded JSON values of types, bool only when it is listed,
+    and strings only when they also match pattern. """
+    match = re.compile(pattern).match if pattern else None
+    strict = not (types is bool or isinstance(types, tuple) and bool in types)
+    def check(v):
+        if not isinstance(v, types) or strict and isinstance(v, bool): return False
+        return match is None or not isinstance(v, basestring) or match(v) is not None
+    return check
+
+def coerce(klass):
+    return lambda v: v if isinstance(v, klass) else klass(v)
+
+def parse_date(v):
+    if isinstance(v, date): return v
+    return datetime.strptime(v[:10], '%Y-%m-%d').date()
+
+def parse_decimal(v):
+    if isinstance(v, Decimal): return v
+    if isinstance(v, float): return Decimal(repr(v))
+    return Decimal(v)
+
+def parse_uuid(v):
+    if isinstance(v, uuid.UUID): return v
+    return uuid.UUID(v)
+
+registry = TypeRegistry()
+registry.register(basestring, TypeConverter('string', check=json_check(basestring)))
+registry.register(bool, TypeConverter('bool', None, coerce(bool), json_check(bool)))
+registry.register(int, TypeConverter('int', None, coerce(int), json_check((int, long))))
+registry.register(long, TypeConverter('int', None, coerce(long), json_check((int, long))))
+registry.register(float, TypeConverter('float', None, coerce(float), json_check((int, long, float))))
+registry.register(datetime, DatetimeConverter())
+registry.register(date, TypeConverter('date', lambda v: v.isoformat(), parse_date,
+    json_check(basestring, r'\d{4}-\d{2}-\d{2}')))
+registry.register(Decimal, TypeConverter('string', str, parse_decimal,
+    json_check((basestring, int, long, float), r'\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$')))
+registry.register(uuid.UUID, TypeConverter('string', str, parse_uuid,
+    json_check(basestring, r'(urn:uuid:)?\{?([0-9a-fA-F]-?){32}\}?$')))
+
+resolve_type = registry.resolve
+
+def register_type(klass, swagger_type, encode=None, decode=None, check=None):
+    """ Adds a type usable in models and signatures, or replaces the
+    conversion of a builtin one. check(value) returns whether a decoded JSON
+    value is acceptable to decode. swagger_type may be a TypeConverter.
+    Types should be registered before RestSwaggerAPI.setup() compiles the
+    serializers that use them. """
+    if isinstance(swagger_type, TypeConverter): converter = swagger_type
+    else: converter = TypeConverter(swagger_type, encode, decode, check)
+    registry.register(klass, converter)
@@ -1,11 +1,55 @@
 import logging
 import os
-from flask import jsonify, Blueprint, render_template
+import hashlib
+import mimetypes
+from flask import Blueprint, render_template, abort
 from flask.globals import request
+from http_utils import CachedBody, BodyCache
+from json_codec import get_codec
 
 logger = logging.getLogger('flask_peewee_swagger')
 current_dir = os.path.dirname(__file__)
 
+class AssetManifest(object):
+    """ The files of a static folder held in memory with a content digest
+    each, served under /assets/<digest>/<path> with far future caching and
+    precompressed text variants. """
+
+    compressible = ('text/', 'application/javascript', 'application/x-javascript', 'application/json')
+    max_age = 365 * 24 * 3600
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = {}
+        self.digests = {}
+
+    def build(self):
+        for root, dirs, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                encodings = ('gzip',) if mimetype.startswith(self.compressible) else ()
+                self.digests[filename] = hashlib.md5(data).hexdigest()[:12]
+                self.assets[filename] = CachedBody(data, mimetype, encodings=encodings, level=9,
+                    headers={'Cache-Control': 'public, max-age=%d' % self.max_age})
+        return self
+
+    def url(self, url_prefix, filename):
+        return '%s/assets/%s/%s' % (url_prefix, self.digests[filename], filename)
+
+    def serve(self, digest, filename):
+        """ Files referenced relatively from a fingerprinted stylesheet arrive
+        with its digest; they are served but only cached briefly. """
+        asset = self.assets.get(filename)
+        if asset is None: abort(404)
+        response = asset.response(request)
+        if digest != self.digests[filename]:
+            response.headers['Cache-Control'] = 'public, max-age=300'
+        return response
+
 class SwaggerUI(object):
     """ Adds a flask blueprint for the swagger ajax UI. """
 
@@ -19,33 +63,64 @@ class SwaggerUI(object):
         self.blueprint = Blueprint(self.blueprint_name, __name__,
             static_folder=os.path.join(current_dir, 'static'),
             template_folder=os.path.join(current_dir, 'templates'))
+        self.manifest = AssetManifest(os.path.join(current_dir, 'static'))
+        self.index_body = None
 
     def setup(self):
+        self.manifest.build()
         self.blueprint.add_url_rule('/', 'index', self.index)
+        self.blueprint.add_url_rule('/assets/<digest>/<path:filename>', 'asset', self.manifest.serve)
         self.app.register_blueprint(self.blueprint, url_prefix=self.url_prefix)
 
+    def asset(self, filename):
+        return self.manifest.url(self.url_prefix, filename)
+
     def index(self):
-        return render_template('swagger-ui.jinja2',
-            static_dir='%s/static' % self.url_prefix,
-            title=self.title,
-            url_prefix=self.app_prefix
-        )
+        if self.index_body is None:
+            self.index_body = CachedBody(render_template('swagger-ui.jinja2',
+                static_dir='%s/static' % self.url_prefix,
+                asset=self.asset,
+                title=self.title,
+                url_prefix=self.app_prefix
+            ), 'text/html', headers={'Cache-Control': 'max-age=0'})
+        return self.index_body.response(request)
 
 
 class Swagger(object):
-    def __init__(self, app, url_prefix='', blueprint_name='Swagger'):
+    def __init__(self, app, url_prefix='', blueprint_name='Swagger', codec=None):
         super(Swagger, self).__init__()
         self.app = app
+        self.codec = get_codec(codec)
         self.apis = {}
         self.url_prefix = url_prefix
         self.blueprint_name = blueprint_name+str(id(self))
         self.blueprint = Blueprint(self.blueprint_name, __name__)
+        self.cache = BodyCache()
+        self.views = {}
+        self.paths = {}
+
+    def add_api(self, name, api):
+        self.apis[name] = api
+        self.invalidate()
+
+    def add_view(self, rule, endpoint, view):
+        """ Registers an extra view under /meta next to the resources. """
+        self.views[endpoint] = (rule, view)
+
+    def invalidate(self):
+        """ Drops the serialized listings, call whenever apis change. """
+        self.cache.clear()
+        self.paths = dict((('%s/%s' % (api.url_prefix, api_name)).lstrip('/'), api)
+            for api_name, api in self.apis.items())
+        for api in self.apis.values():
+            api.cache.clear()
 
     def setup(self):
+        self.invalidate()
         self.blueprint.add_url_rule('/resources', 'resources', self.swagger_resources)
-        for api_name, api in self.apis.items():
-            self.blueprint.add_url_rule('/resources%s/%s' % (api.url_prefix, api_name),
-                api_name, api.swagger_resource)
+        for endpoint, (rule, view) in self.views.items():
+            self.blueprint.add_url_rule(rule, endpoint, view)
+        self.blueprint.add_url_rule('/resources/<path:api_path>', 'resource', self.swagger_resource)
         self.app.register_blueprint(self.blueprint,
             url_prefix='%s/meta' % self.url_prefix)
 
@@ -57,26 +132,51 @@ class Swagger(object):
         return base_uri
 
     def swagger_resources(self):
+        base_uri = self.base_uri()
+        body = self.cache.get(base_uri, lambda: self.swagger_resources_body(base_uri))
+        return body.response(request)
+
+    def swagger_resource(self, api_path):
+        api = self.paths.get(api_path)
+        if api is None: abort(404)
+        return api.swagger_resource()
+
+    def swagger_resources_body(self, base_uri):
         data = {
             'apiVersion': '0.1',
             'swaggerVersion': '1.1',
-            'basePath': '%s%s' % (self.base_uri(), self.url_prefix),
+            'basePath': '%s%s' % (base_uri, self.url_prefix),
             'apis': [{
                 'path': '/meta/resources%s/%s' % (api.url_prefix, api_name),
                 'description': api.description
             } for api_name, api in self.apis.items()]
         }
-        response = jsonify(data)
-        response.headers.add('Cache-Control', 'max-age=0')
-        return response
+        return CachedBody(self.codec.dumps(data), headers={'Cache-Control': 'max-age=0'})
 
 class SwaggerAPI(object):
-    def __init__(self, name, description, url_prefix=''):
+    def __init__(self, name, description, url_prefix='', codec=None):
+        self.codec = get_codec(codec)
         self.description = description
         self.name = name
         self.apis = []
+        self.paths = {}
         self.models = {}
         self.url_prefix = url_prefix
+        self.cache = BodyCache()
+        self.builder = None
+        self.described = set()
+
+    def add_operation(self, path, description, operation):
+        api = self.paths.get(path)
+        if api is None:
+            api = self.paths[path] = {
+                'path': path,
+                'description': description,
+                'operations': []
+            }
+            self.apis.append(api)
+        api['operations'].append(operation)
+        self.cache.clear()
 
     def base_uri(self):
         base_uri = request.host_url
@@ -86,14 +186,18 @@ class SwaggerAPI(object):
 
     def swagger_resource(self):
         """ Details of a specific model resource. """
+        base_uri = self.base_uri()
+        body = self.cache.get(base_uri, lambda: self.swagger_resource_body(base_uri))
+        return body.response(request)
+
+    def swagger_resource_body(self, base_uri):
+        if self.builder: self.builder(self)
         data = {
             'apiVersion': '0.1',
             'swaggerVersion': '1.1',
-            'basePath': '%s%s' % (self.base_uri(), self.url_prefix),
+            'basePath': '%s%s' % (base_uri, self.url_prefix),
             'resourcePath': '/meta/%s' % (self.name),
             'apis': self.apis,
             'models': self.models
         }
-        response = jsonify(data)
-        response.headers.add('Cache-Control', 'max-age=0')
-        return response
\ No newline at end of file
+        return CachedBody(self.codec.dumps(data), headers={'Cache-Control': 'max-age=0'})
\ No newline at end of file
@@ -0,0 +1,149 @@
+""" Checks that the compiled encoders and decoders give the same output as the
+generic to_json / from_json reference path, for every installed codec:
+
+    python -m unittest discover -s tests
+"""
+import os, sys, copy, json, unittest
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask
+from swagger_ui import Swagger
+from flask_swagger import RestSwaggerAPI, Member, to_json, from_json, compile_to_json, compile_from_json
+from json_codec import JSONCodec, get_codec
+
+reference_codec = JSONCodec()
+
+def build(codec):
+    app = flask.Flask('test')
+    api = RestSwaggerAPI(Swagger(app), app, codec=codec)
+
+    @api.model({'name': str, 'quantity': int, 'price': Member(float)})
+    class Line(object): pass
+
+    @api.model({'x': int, 'y': Member(int), 'label': Member(str)}, slots=True)
+    class Point(object): pass
+
+    @api.model({
+        'id': int,
+        'customer': Member(str),
+        'created': datetime,
+        'shipped': Member(datetime),
+        'status': ('open', 'paid', 'closed'),
+        'tags': [str],
+        'lines': [Line],
+        'by_name': Member({str: Line}),
+        'points': Member([Point]),
+        })
+    class Order(object): pass
+
+    for model in api.swagger_models: model.compile()
+    return api, Line, Point, Order
+
+def plain(value):
+    """ Decoded values with slots records turned into dicts, for comparison. """
+    if isinstance(value, list): return [plain(v) for v in value]
+    if isinstance(value, dict): return dict((k, plain(v)) for k, v in value.items())
+    if hasattr(value, '__slots__'): return dict((name, plain(getattr(value, name))) for name in value.__slots__)
+    return value
+
+class CodecTestCase(object):
+    def setUp(self):
+        self.codec = get_codec(self.codec_name)
+        if self.codec.name != self.codec_name: self.skipTest('%s is not installed' % (self.codec_name))
+        self.api, self.Line, self.Point, self.Order = build(self.codec)
+
+    def order(self, i, created=datetime(2014, 1, 1, 12, 30, 5, 250000)):
+        order = self.Order()
+        order.id = i
+        order.customer = 'customer %d' % i
+        order.created = created
+        order.shipped = None
+        order.status = 'paid'
+        order.tags = ['a', 'b']
+        order.lines = [{'name': 'item', 'quantity': j, 'price': j * 1.5} for j in range(3)]
+        order.by_name = {'first': {'name': 'first', 'quantity': 1, 'price': None}}
+        order.points = [self.Point(x=1, y=2, label='p'), self.Point(x=3)]
+        return order
+
+    def assertEncodes(self, t, value):
+        compiled = self.codec.loads(self.codec.dumps(compile_to_json(t, self.codec)(value)))
+        reference = json.loads(reference_codec.dumps(to_json(t, value)))
+        self.assertEqual(compiled, reference)
+        return reference
+
+    def assertDecodes(self, t, data):
+        compiled = compile_from_json(t, self.codec)
+        compiled = compiled(copy.deepcopy(data)) if compiled else data
+        reference = from_json(t, copy.deepcopy(data))
+        self.assertEqual(plain(compiled), plain(reference))
+        return reference
+
+    def test_nested_models(self):
+        orders = [self.order(i) for i in range(3)]
+        data = self.assertEncodes([self.Order], orders)
+        self.assertEqual(data[0]['lines'][1], {'name': 'item', 'quantity': 1, 'price': 1.5})
+        self.assertDecodes([self.Order], data)
+
+    def test_dict_of_models(self):
+        lines = {'a': {'name': 'a', 'quantity': 1, 'price': 2.5}, 'b': {'name': 'b', 'quantity': 2, 'price': None}}
+        data = self.assertEncodes({str: self.Line}, lines)
+        self.assertEqual(data['b']['price'], None)
+        self.assertDecodes({str: self.Line}, data)
+
+    def test_allowable_values(self):
+        order = self.order(1)
+        for status in ('open', 'closed'):
+            order.status = status
+            self.assertEqual(self.assertEncodes(self.Order, order)['status'], status)
+        self.assertEqual(self.assertDecodes(self.Order, {'status': 'open'})['status'], 'open')
+
+    def test_none_members(self):
+        order = self.Order()
+        order.id = 1
+        data = self.assertEncodes(self.Order, order)
+        self.assertEqual(data['customer'], None)
+        self.assertEqual(data['lines'], None)
+        self.assertDecodes(self.Order, data)
+        self.assertDecodes(self.Order, {'id': 1})
+
+    def test_none_list_elements(self):
+        order = self.order(1)
+        order.lines = [None, {'name': 'item', 'quantity': 1, 'price': 1.5}]
+        order.tags = ['a', None]
+        order.points = [None, self.Point(x=1)]
+        self.assertEncodes(self.Order, order)
+        self.assertEncodes([self.Order], [None, order])
+        self.assertEncodes({str: self.Line}, {'a': None})
+        self.assertDecodes([self.Order], [None, {'id': 1, 'lines': [None], 'points': [None]}])
+        self.assertDecodes({str: self.Line}, {'a': None})
+
+    def test_datetimes(self):
+        for created in (datetime(2014, 1, 1, 12, 30, 5, 250000), datetime(2014, 1, 1, 12, 30, 5)):
+            data = self.assertEncodes(self.Order, self.order(1, created))
+            self.assertEqual(data['created'], created.strftime('%Y-%m-%dT%H:%M:%S.%f'))
+            self.assertEqual(self.assertDecodes(self.Order, data)['created'], created)
+        for text in ('2014-01-01T12:30:05', '2014-01-01T12:30:05.25', '2014-01-01T12:30:05.250000'):
+            self.assertDecodes(self.Order, {'id': 1, 'created': text})
+
+    def test_slots_records(self):
+        points = [self.Point(x=1, y=2, label='a'), self.Point(x=3), {'x': 4, 'y': 5, 'label': 'dict'}]
+        data = self.assertEncodes([self.Point], points)
+        self.assertEqual(data[1], {'x': 3, 'y': None, 'label': None})
+        decoded = self.assertDecodes([self.Point], data)
+        self.assertTrue(isinstance(decoded[0], self.Point))
+        self.assertEqual((decoded[2].x, decoded[2].label), (4, 'dict'))
+        decoded = self.assertDecodes([self.Point], [{'x': 1, 'unknown': 2}])
+        self.assertEqual((decoded[0].x, decoded[0].y), (1, None))
+
+class TestJSONCodec(CodecTestCase, unittest.TestCase):
+    codec_name = 'json'
+
+class TestSimpleJSONCodec(CodecTestCase, unittest.TestCase):
+    codec_name = 'simplejson'
+
+class TestUJSONCodec(CodecTestCase, unittest.TestCase):
+    codec_name = 'ujson'
+
+if __name__ == '__main__':
+    unittest.main()